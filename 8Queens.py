@@ -1,12 +1,18 @@
 import tkinter as tk
 
+from QueensCore import cell_size_for, read_board_size
+from QueensUI import BoardCanvas
+
 N = 8
 CELL_SIZE = 60  
 
 class EightQueensUI:
-    def __init__(self, root):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -17,7 +23,7 @@ class EightQueensUI:
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N*CELL_SIZE, height=N*CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()  
@@ -27,29 +33,16 @@ class EightQueensUI:
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        """Vẽ bàn cờ 8x8 trắng đen"""
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c*CELL_SIZE, r*CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r+c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-  
-        for (r, c) in self.queens:
-            x = c*CELL_SIZE + CELL_SIZE//2
-            y = r*CELL_SIZE + CELL_SIZE//2
-            fill_color = "black" if (r+c) % 2 == 0 else "white"  #
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        """Vẽ bàn cờ NxN trắng đen"""
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
         """Xử lý khi click chuột lên ô"""
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))  
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))  
@@ -64,9 +57,9 @@ class EightQueensUI:
 
     def update_status(self):
         q = len(self.queens)
-        self.lbl_status.config(text=f"Queens: {q}/8")
+        self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size(max_n=None))
     root.mainloop()
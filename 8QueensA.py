@@ -1,14 +1,24 @@
 import tkinter as tk
 import heapq
 import math
+from itertools import count, islice
+
+from QueensCore import EMPTY_MASKS, CompactNodes, StepCostModel, iter_columns, free_mask, place, remaining_attacks, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
 
 N = 8
 CELL_SIZE = 60
+COST_SCALE = None  # vd 10**6: cộng chi phí bằng số nguyên thay vì số thực
+BOUND_EPSILON = 1e-9  # bù sai số làm tròn số thực khi so cận dưới với g
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - A* Algorithm")
+        self.n = n
+        self.cost_model = StepCostModel(n, scale=COST_SCALE)
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - A* Algorithm")
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
 
@@ -24,39 +34,30 @@ class EightQueensUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = [] 
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -64,113 +65,148 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
     # --- Giải thuật A* ---
     
-    def an_toan(self, state, col, row):
-        """Hàm kiểm tra an toàn (giữ nguyên)."""
-        for r, c in enumerate(state):
-            if c == col or abs(c - col) == abs(r - row):
-                return False
-        return True
-
-    def calculate_g_cost(self, current_g_cost, state, col, row):
-        """Hàm g(n): Tính chi phí thực tế từ UCS."""
-        if not state:
+    def calculate_g_cost(self, current_g_cost, last_c, col):
+        """Hàm g(n): Tính chi phí thực tế từ UCS (last_c: cột của hậu ở hàng trước, None nếu chưa có)."""
+        if last_c is None:
             return current_g_cost
-        
-        last_r = len(state) - 1
-        last_c = state[-1]
-        
-        distance = math.sqrt((row - last_r)**2 + (col - last_c)**2)
-        
-        return current_g_cost + distance
-
-    def calculate_h_cost(self, state):
-        """Hàm h(n): Tính chi phí ước tính từ Greedy."""
-        num_placed = len(state)
-        if num_placed == N:
-            return 0
-
-        attacked_squares = set()
-        
-        for r, c in enumerate(state):
-            for i in range(num_placed, N):
-                attacked_squares.add((i, c))
-                if 0 <= c + (i - r) < N:
-                    attacked_squares.add((i, c + (i - r)))
-                if 0 <= c - (i - r) < N:
-                    attacked_squares.add((i, c - (i - r)))
-        
-        return len(attacked_squares)
+        return current_g_cost + self.cost_model.step(last_c, col)
+
+    def calculate_h_cost(self, masks):
+        """Hàm h(n): Tính chi phí ước tính từ Greedy (số ô bị tấn công ở các hàng còn lại), đọc từ bộ mask."""
+        return remaining_attacks(self.n, masks) * self.cost_model.unit
 
     def a_star_solutions(self):
-        solutions = []
-        pq = [(0 + self.calculate_h_cost([]), 0, [])]
+        solutions = list(self.iter_a_star_solutions())
+        solutions.sort(key=lambda x: x[0])
+        return solutions
 
-        while pq:
-            f_cost, g_cost, state = heapq.heappop(pq)
-            row = len(state)
+    def iter_a_star_solutions(self, cancel=None):
+        """Sinh lần lượt (g, nghiệm) theo thứ tự lấy ra khỏi hàng đợi ưu tiên (chưa sắp theo g)."""
+        nodes = CompactNodes(self.n)
+        pq = [nodes.entry(CompactNodes.ROOT, 0 + self.calculate_h_cost(EMPTY_MASKS), 0)]  # mỗi mục gói (f, g, nút)
 
-            if row == N:
-                solutions.append((round(g_cost, 2), state))
+        while pq:
+            check_cancelled(cancel)
+            entry = heapq.heappop(pq)
+            f_cost, g_cost = nodes.priorities(entry, 2)
+            node = nodes.node(entry)
+            row = nodes.row(node)
+
+            if row == self.n:
+                yield (self.cost_model.display(g_cost), nodes.path(node))
                 continue
 
-            for col in range(N):
-                if self.an_toan(state, col, row):
-                    new_state = state + [col]
-                    g_new = self.calculate_g_cost(g_cost, state, col, row)
-                    h_new = self.calculate_h_cost(new_state)
-                    f_new = g_new + h_new
-                    
-                    heapq.heappush(pq, (f_new, g_new, new_state))
-        
-        solutions.sort(key=lambda x: x[0])
-        return solutions
+            for f_new, g_new, child in self.a_star_children(nodes, node, g_cost, row):
+                heapq.heappush(pq, nodes.entry(child, f_new, g_new))
+
+    def a_star_children(self, nodes, node, g_cost, row):
+        """Sinh (f, g, nút con) cho các cột an toàn ở hàng row."""
+        masks = nodes.masks(node)
+        last_c = nodes.last_col(node, row)
+        for col in iter_columns(free_mask(self.n, masks)):
+            child_masks = place(self.n, masks, col)
+            g_new = self.calculate_g_cost(g_cost, last_c, col)
+            h_new = self.calculate_h_cost(child_masks)
+            f_new = g_new + h_new
+
+            yield f_new, g_new, nodes.child(node, row, col, child_masks)
+
+    def iter_a_star_best(self, cancel=None):
+        """Sinh (g, nghiệm) theo g tăng dần và dừng được bất cứ lúc nào (dùng cho k nghiệm rẻ nhất).
+
+        h(n) số ô bị tấn công không phải cận dưới của g, nên ở chế độ này hàng đợi
+        xếp theo cận dưới g + (số hàng còn lại) * cost_model.min_step, f cũ chỉ dùng để phá
+        hoà. Cận dưới này nhất quán nên nghiệm ra theo g tăng dần; nghiệm vẫn được giữ
+        trong heap ready cho tới khi cận dưới nhỏ nhất còn mở không nhỏ hơn nó, để sai
+        số làm tròn không đảo thứ tự. Generator giữ nguyên hàng đợi giữa các lần lấy.
+        """
+        nodes = CompactNodes(self.n)
+        min_step = self.cost_model.min_step
+        pq = [nodes.entry(CompactNodes.ROOT, 0, 0, 0)]  # mỗi mục gói (cận dưới của g, f, g, nút)
+        ready = []  # (g đã làm tròn, thứ tự lấy ra, nghiệm)
+        order = count()
+
+        while pq:
+            check_cancelled(cancel)
+            entry = heapq.heappop(pq)
+            bound, f_cost, g_cost = nodes.priorities(entry, 3)
+            node = nodes.node(entry)
+            row = nodes.row(node)
+
+            if row == self.n:
+                heapq.heappush(ready, (self.cost_model.display(g_cost), next(order), nodes.path(node)))
+            else:
+                steps_left = self.n - row - 1
+                for f_new, g_new, child in self.a_star_children(nodes, node, g_cost, row):
+                    heapq.heappush(pq, nodes.entry(child, g_new + steps_left * min_step, f_new, g_new))
+
+            floor = self.cost_model.display(nodes.priorities(pq[0], 3)[0] - BOUND_EPSILON) if pq else math.inf
+            while ready and ready[0][0] <= floor:
+                g_cost, _, state = heapq.heappop(ready)
+                yield (g_cost, state)
+
+        while ready:
+            g_cost, _, state = heapq.heappop(ready)
+            yield (g_cost, state)
+
+    def a_star_best(self, k):
+        """k nghiệm có g nhỏ nhất."""
+        return list(islice(self.iter_a_star_best(), k))
 
     # --- Hiển thị nghiệm ---
     def prepare_solutions(self):
-        self.solutions = self.a_star_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_a_star_best)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol_state = self.solutions[idx][1]
-        self.queens = {(r, sol_state[r]) for r in range(N)}
+    def show_solution(self, sol):
+        sol_state = sol[1]
+        self.queens = {(r, sol_state[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve A* trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve A* trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
@@ -1,14 +1,113 @@
 import tkinter as tk
-import copy
-from itertools import product
+
+from QueensCore import full_mask, iter_columns, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
 
 N = 8
 CELL_SIZE = 60
 
-class AndOrSearchUI:
-    def __init__(self, root):
+class BitsetDomains:
+    """Miền giá trị và đồ thị ràng buộc dạng bitset, mọi thay đổi được ghi lên trail để hoàn tác.
+
+    Bit c của domains[r] bằng 1 nghĩa là hàng r còn đặt được hậu ở cột c; bit b của
+    edges[a] bằng 1 nghĩa là hai hàng a, b còn ràng buộc nhau. Miền chỉ thu hẹp khi đi
+    sâu nên cạnh chỉ có thể mất đi: sau mỗi phép gán chỉ cần kiểm tra lại các cạnh của
+    những hàng vừa bị thu hẹp miền. Quay lui chỉ cần undo về mốc mark() đã lấy thay vì
+    sao chép toàn bộ các miền và dựng lại đồ thị.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.full = full_mask(n)
+        self.domains = [self.full] * n
+        # Miền đầy đủ thì hai hàng bất kỳ đều có thể cùng cột
+        self.edges = [self.full & ~(1 << v) for v in range(n)]
+        self.trail = []  # các bộ (danh sách, chỉ số, giá trị trước khi thay đổi)
+
+    def __getitem__(self, var):
+        return self.domains[var]
+
+    def attack_mask(self, var, val, other):
+        """Các cột của hàng other bị hậu (var, val) tấn công: cùng cột và hai đường chéo."""
+        bit = 1 << val
+        dist = abs(other - var)
+        return (bit | (bit << dist) | (bit >> dist)) & self.full
+
+    def mark(self):
+        return len(self.trail)
+
+    def _set(self, store, index, value):
+        self.trail.append((store, index, store[index]))
+        store[index] = value
+
+    def restrict(self, var, mask):
+        """Giữ lại các giá trị trong mask, trả về miền mới (0 nghĩa là rỗng)."""
+        old = self.domains[var]
+        new = old & mask
+        if new != old:
+            self._set(self.domains, var, new)
+        return new
+
+    def assign(self, var, val, scope):
+        """Gán var = val rồi kiểm tra tiến lên các hàng trong bitmask scope.
+
+        Trả về False nếu có miền bị rỗng; ngược lại cập nhật các cạnh trong scope.
+        """
+        self.restrict(var, 1 << val)
+        changed = 0
+        for v in iter_columns(scope):
+            old = self.domains[v]
+            new = self.restrict(v, ~self.attack_mask(var, val, v))
+            if not new:
+                return False
+            if new != old:
+                changed |= 1 << v
+        self.drop_edges(changed, scope)
+        return True
+
+    def drop_edges(self, changed, scope):
+        edges, domains = self.edges, self.domains
+        for a in iter_columns(changed):
+            da = domains[a]
+            lost = 0
+            for b in iter_columns(edges[a] & scope):
+                # Còn cạnh nếu một giá trị nào đó của a tấn công được miền của b
+                dist = abs(a - b)
+                if not (da | (da << dist) | (da >> dist)) & domains[b]:
+                    lost |= 1 << b
+                    self._set(edges, b, edges[b] & ~(1 << a))
+            if lost:
+                self._set(edges, a, edges[a] & ~lost)
+
+    def components(self, scope):
+        """Tách bitmask scope thành các thành phần liên thông, xếp theo hàng nhỏ nhất."""
+        comps = []
+        while scope:
+            comp = frontier = scope & -scope
+            while frontier:
+                bit = frontier & -frontier
+                frontier ^= bit
+                reached = self.edges[bit.bit_length() - 1] & scope & ~comp
+                comp |= reached
+                frontier |= reached
+            comps.append(comp)
+            scope &= ~comp
+        return comps
+
+    def undo(self, mark):
+        trail = self.trail
+        while len(trail) > mark:
+            store, index, old = trail.pop()
+            store[index] = old
+
+
+class AndOrSearchUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - AND-OR Search (CSP)")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - AND-OR Search (CSP)")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -25,182 +124,135 @@ class AndOrSearchUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Nhấn 'Solve AND-OR' để bắt đầu", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
         self.draw_board()
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for r, c in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
         self.root.update_idletasks()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.lbl_status.config(text="Nhấn 'Solve AND-OR' để bắt đầu")
 
     def update_status(self):
-        if self.solutions:
-            self.lbl_status.config(text=f"Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Solution {self.stream.progress()}")
         else:
             self.lbl_status.config(text="Đang giải...")
 
     def prepare_solutions(self):
+        if self.is_solving():
+            self.root.bell()
+            return
         self.clear_board()
         self.update_status()
-        
-        self.solutions = self.nqueens_and_or_solver()
-        
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        self.stream = SolutionStream(lambda cancel: self.iter_and_or_solutions(cancel=cancel))
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
+    def show_solution(self, sol):
         self.queens = {(r, col) for r, col in enumerate(sol)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions: return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.stream is None or self.is_solving(): return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions: return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.stream is None or self.is_solving(): return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
     # --- Thuật toán AND-OR Search ---
-    
-    def an_toan(self, state, row, col):
-        for r, c in enumerate(state):
-            if c == col or abs(row - r) == abs(col - c):
-                return False
-        return True
 
-    def consistent(self, assign, var, val):
-        state = [assign[r] for r in sorted(assign)]
-        return self.an_toan(state, var, val)
-
-    def build_constraint_graph(self, unassigned, domains):
-        graph = {v: set() for v in unassigned}
-        for i in range(len(unassigned)):
-            for j in range(i + 1, len(unassigned)):
-                a, b = unassigned[i], unassigned[j]
-                edge = False
-                for ca in domains[a]:
-                    for cb in domains[b]:
-                        if ca == cb or abs(a - b) == abs(ca - cb):
-                            edge = True
-                            break
-                    if edge: break
-                if edge:
-                    graph[a].add(b)
-                    graph[b].add(a)
-        return graph
-
-    def connected_components(self, graph):
-        seen = set()
-        comps = []
-        for v in graph:
-            if v in seen: continue
-            comp = []
-            stack = [v]
-            seen.add(v)
-            while stack:
-                x = stack.pop()
-                comp.append(x)
-                for nb in graph[x]:
-                    if nb not in seen:
-                        seen.add(nb)
-                        stack.append(nb)
-            comps.append(comp)
-        return comps
+    def AndSearch(self, components, domains, find_all=True, cancel=None):
+        """Sinh lần lượt từng tổ hợp nghiệm của các thành phần độc lập (thứ tự như product).
 
-    def OrSearch(self, unassigned, domains, assign, find_all=True):
-        if not unassigned:
-            return [dict(assign)]
-        var = min(unassigned, key=lambda v: len(domains[v]))
-        solutions = []
-        for val in sorted(list(domains[var])):
-            if not self.consistent(assign, var, val):
+        Thành phần sau được giải lại cho mỗi nghiệm của thành phần đầu thay vì dựng sẵn
+        danh sách nghiệm của mọi thành phần; các thành phần tách ra thường chỉ gồm vài
+        hàng nên giải lại rất rẻ.
+        """
+        first, rest = components[0], components[1:]
+        for sol in self.OrSearch(first, domains, find_all, cancel):
+            if not rest:
+                yield sol
                 continue
-            assign2 = dict(assign)
-            assign2[var] = val
-            domains2 = copy.deepcopy(domains)
-            domains2[var] = {val}
-            failure = False
-            for v in unassigned:
-                if v == var: continue
-                remove = set()
-                for cv in domains2[v]:
-                    if cv == val or abs(v - var) == abs(cv - val):
-                        remove.add(cv)
-                if remove:
-                    domains2[v] -= remove
-                    if not domains2[v]:
-                        failure = True
-                        break
-            if failure:
-                continue
-            remaining = [v for v in unassigned if v != var]
-            if not remaining:
-                solutions.append(dict(assign2))
-                if not find_all: return solutions
-                continue
-            
-            graph = self.build_constraint_graph(remaining, domains2)
-            components = self.connected_components(graph)
-            comp_solutions_list = []
-            comp_failed = False
-            for comp in components:
-                comp_sols = self.OrSearch(comp, domains2, assign2) 
-                if not comp_sols:
-                    comp_failed = True
-                    break
-                comp_solutions_list.append(comp_sols)
-            if comp_failed:
-                continue
-            for prod in product(*comp_solutions_list):
-                merged = dict(assign2)
-                for d in prod:
-                    merged.update(d)
-                solutions.append(merged)
-                if not find_all and solutions:
-                    return solutions
-        return solutions
-
-    def nqueens_and_or_solver(self, N=8, find_all=True):
-        variables = list(range(N))
-        domains_init = {v: set(range(N)) for v in variables}
-        all_solutions = self.OrSearch(variables, domains_init, {}, find_all)
-        return [[sol[r] for r in range(N)] for sol in all_solutions]
+            found = False
+            for tail in self.AndSearch(rest, domains, find_all, cancel):
+                found = True
+                merged = dict(sol)
+                merged.update(tail)
+                yield merged
+            if not found:
+                return  # các thành phần sau không phụ thuộc sol nên sẽ không bao giờ có nghiệm
+
+    def OrSearch(self, unassigned, domains, find_all=True, cancel=None):
+        """Sinh các phép gán {hàng: cột} cho đúng các hàng trong bitmask unassigned.
+
+        Miền giá trị luôn đã được kiểm tra tiến với mọi biến đã gán, nên không cần
+        kiểm tra lại từng giá trị. Mọi thay đổi trên domains được hoàn tác trước khi
+        thử giá trị kế tiếp. find_all=False: dừng ngay sau nghiệm đầu tiên.
+        """
+        check_cancelled(cancel)
+        if not unassigned:
+            yield {}
+            return
+        var = min(iter_columns(unassigned), key=lambda v: domains[v].bit_count())
+        remaining = unassigned & ~(1 << var)
+        for val in iter_columns(domains[var]):
+            mark = domains.mark()
+            try:
+                if not domains.assign(var, val, remaining):
+                    continue
+                if not remaining:
+                    yield {var: val}
+                    if not find_all: return
+                    continue
+
+                # AND: các thành phần không còn ràng buộc nhau được giải độc lập
+                components = domains.components(remaining)
+                if len(components) == 1:
+                    tails = self.OrSearch(remaining, domains, find_all, cancel)
+                else:
+                    tails = self.AndSearch(components, domains, find_all, cancel)
+                for tail in tails:
+                    merged = {var: val}
+                    merged.update(tail)
+                    yield merged
+                    if not find_all: return
+            finally:
+                domains.undo(mark)
+
+    def iter_and_or_solutions(self, n=None, find_all=True, cancel=None):
+        """Sinh lần lượt từng nghiệm dạng danh sách cột, không dựng sẵn cả danh sách."""
+        if n is None:
+            n = self.n
+        for sol in self.OrSearch(full_mask(n), BitsetDomains(n), find_all, cancel):
+            yield [sol[r] for r in range(n)]
+
+    def nqueens_and_or_solver(self, n=None, find_all=True):
+        return list(self.iter_and_or_solutions(n, find_all))
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = AndOrSearchUI(root)
+    app = AndOrSearchUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
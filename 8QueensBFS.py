@@ -1,13 +1,19 @@
 import tkinter as tk
 from collections import deque
 
+from QueensCore import np, EMPTY_MASKS, iter_columns, free_mask, place, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
+
 N = 8
 CELL_SIZE = 60  
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -24,15 +30,18 @@ class EightQueensUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N*CELL_SIZE, height=N*CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()  
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
@@ -40,26 +49,14 @@ class EightQueensUI:
     # Vẽ bàn cờ và quân hậu
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c*CELL_SIZE, r*CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r+c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c*CELL_SIZE + CELL_SIZE//2
-            y = r*CELL_SIZE + CELL_SIZE//2
-            fill_color = "black" if (r+c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))  
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))  
@@ -67,79 +64,123 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index+1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
  
     # Giải thuật BFS
  
-    def is_safe(self, state, row, col):
-        for r, c in enumerate(state):
-            if c == col or abs(r - row) == abs(c - col):
-                return False
-        return True
-
     def bfs_all_solutions(self):
-        solutions = []
-        q = deque([[]])
+        return list(self.iter_bfs_solutions())
+
+    def iter_bfs_solutions(self, cancel=None):
+        """Sinh lần lượt từng nghiệm theo thứ tự BFS lấy ra khỏi hàng đợi (thiếu NumPy thì dùng deque)."""
+        if np is not None:
+            yield from self.iter_bfs_levels(cancel)
+            return
+
+        q = deque([([], EMPTY_MASKS)])
 
         while q:
-            state = q.popleft()
+            check_cancelled(cancel)
+            state, masks = q.popleft()
             row = len(state)
 
-            if row == N:
-                solutions.append(state)
+            if row == self.n:
+                yield state
                 continue
 
-            for col in range(N):
-                if self.is_safe(state, row, col):
-                    q.append(state + [col])
+            for col in iter_columns(free_mask(self.n, masks)):
+                q.append((state + [col], place(self.n, masks, col)))
+
+    def iter_bfs_levels(self, cancel=None):
+        """BFS đồng bộ theo mức bằng NumPy, cho nghiệm cùng thứ tự với hàng đợi.
+
+        Mỗi mức là một ma trận cột (mỗi dòng một trạng thái) cùng ba vector mask,
+        và được mở rộng cả mức một lượt, mỗi lượt một cột. Sắp ổn định theo chỉ số
+        nút cha đưa các con về đúng thứ tự (nút cha, cột) như khi lấy ra khỏi hàng đợi.
+        """
+        n = self.n
+        full = (1 << n) - 1
+        states = np.zeros((1, 0), dtype=np.int8)
+        cols = np.zeros(1, dtype=np.int64)
+        ld = np.zeros(1, dtype=np.int64)
+        rd = np.zeros(1, dtype=np.int64)
+
+        for row in range(n):
+            free = full & ~(cols | ld | rd)
+            parents = []
+            for col in range(n):
+                check_cancelled(cancel)
+                parents.append(np.flatnonzero((free >> col) & 1))
+            new_cols = np.repeat(np.arange(n, dtype=np.int8), [len(p) for p in parents])
+            parents = np.concatenate(parents)
+            if len(parents) == 0:
+                return
+            order = np.argsort(parents, kind="stable")
+            parents, new_cols = parents[order], new_cols[order]
 
-        return solutions
+            bits = np.left_shift(1, new_cols.astype(np.int64))
+            states = np.concatenate((states[parents], new_cols[:, None]), axis=1)
+            cols = cols[parents] | bits
+            ld = ((ld[parents] | bits) << 1) & full
+            rd = (rd[parents] | bits) >> 1
+
+        # Đổi từng dòng sang list khi cần: tolist() cả ma trận tốn gấp nhiều lần bộ nhớ int8
+        for state in states:
+            yield state.tolist()
 
 
     # Hiển thị nghiệm
 
     def prepare_solutions(self):
-        self.solutions = self.bfs_all_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_bfs_solutions)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
-        self.queens = {(r, sol[r]) for r in range(N)}
+    def show_solution(self, sol):
+        self.queens = {(r, sol[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve BFS trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve BFS trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 
 # Main
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
@@ -1,14 +1,21 @@
 import tkinter as tk
 import heapq
+from operator import itemgetter
+
+from QueensCore import EMPTY_MASKS, iter_columns, free_mask, place, remaining_attacks, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
 
 N = 8
 CELL_SIZE = 60
 BEAM_WIDTH = 400
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - Beam Search")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - Beam Search")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -25,40 +32,31 @@ class EightQueensUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = [] 
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -66,104 +64,94 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
     # --- Giải thuật Beam Search ---
     
-    def an_toan(self, state, col, row):
-        """Hàm kiểm tra an toàn."""
-        for r, c in enumerate(state):
-            if c == col or abs(c - col) == abs(r - row):
-                return False
-        return True
-
-    def calculate_h_cost(self, state):
-        """Hàm h(n): Tính chi phí ước tính (số ô bị tấn công ở các hàng còn lại)."""
-        num_placed = len(state)
-        if num_placed == N:
-            return 0
-
-        attacked_squares = set()
-        for r, c in enumerate(state):
-            for i in range(num_placed, N):
-                attacked_squares.add((i, c))
-                if 0 <= c + (i - r) < N:
-                    attacked_squares.add((i, c + (i - r)))
-                if 0 <= c - (i - r) < N:
-                    attacked_squares.add((i, c - (i - r)))
-        
-        return len(attacked_squares)
-
-    def beam_search_solutions(self):
+    def calculate_h_cost(self, masks):
+        """Hàm h(n): Tính chi phí ước tính (số ô bị tấn công ở các hàng còn lại) từ bộ mask của nút."""
+        return remaining_attacks(self.n, masks)
+
+    def successors(self, beam, cancel=None):
+        """Sinh (h, trạng thái cha, cột, mask con) cho mọi nút con; chưa dựng danh sách trạng thái con."""
+        for cost, state, masks in beam:
+            check_cancelled(cancel)
+            for col in iter_columns(free_mask(self.n, masks)):
+                child_masks = place(self.n, masks, col)
+                yield self.calculate_h_cost(child_masks), state, col, child_masks
+
+    def beam_search_solutions(self, cancel=None):
         """Hàm tìm nghiệm bằng Beam Search."""
-        beam = [(self.calculate_h_cost([]), [])]
-
-        for row in range(N):
-            all_successors = []
-            
-            for cost, state in beam:
-                if len(state) == N:
-                    continue
-                for col in range(N):
-                    if self.an_toan(state, col, row):
-                        new_state = state + [col]
-                        h_cost = self.calculate_h_cost(new_state)
-                        all_successors.append((h_cost, new_state))
-
-            if not all_successors:
+        beam = [(self.calculate_h_cost(EMPTY_MASKS), [], EMPTY_MASKS)]
+
+        for row in range(self.n):
+            # nsmallest giữ một heap cỡ BEAM_WIDTH và cho kết quả như sorted(...)[:BEAM_WIDTH]
+            # (ổn định theo thứ tự sinh), nên chỉ nút được chọn mới phải dựng trạng thái
+            best = heapq.nsmallest(BEAM_WIDTH, self.successors(beam, cancel), key=itemgetter(0))
+            if not best:
                 break
-            all_successors.sort(key=lambda x: x[0])
-            beam = all_successors[:BEAM_WIDTH]
+            beam = [(h_cost, state + [col], masks) for h_cost, state, col, masks in best]
         final_solutions = []
-        for cost, state in beam:
-            if len(state) == N:
+        for cost, state, masks in beam:
+            if len(state) == self.n:
                 final_solutions.append(state)
         
         return final_solutions
 
+    def iter_beam_solutions(self, cancel=None):
+        """Nguồn nghiệm của nút Solve: beam chỉ bắt đầu chạy khi nghiệm đầu tiên được lấy trên luồng phụ."""
+        yield from self.beam_search_solutions(cancel)
+
 
     # --- Hiển thị nghiệm ---
     def prepare_solutions(self):
-        self.solutions = self.beam_search_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_beam_solutions)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
-        self.queens = {(r, sol[r]) for r in range(N)}
+    def show_solution(self, sol):
+        self.queens = {(r, sol[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve Beam Search trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve Beam Search trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
@@ -1,13 +1,95 @@
 import tkinter as tk
 from collections import deque
 
+from QueensCore import full_mask, iter_columns, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
+
 N = 8
 CELL_SIZE = 60
+MAX_BELIEF_N = 9  # số niềm tin phải duyệt tăng rất nhanh theo N (N = 9: gần 1 triệu)
+
+class SensorlessQueens:
+    """Bài toán N hậu không cảm biến: tác tử không nhìn thấy bàn cờ.
+
+    Trạng thái vật lý là bàn cờ có đúng một hậu trên mỗi hàng. Ban đầu tác tử tin mọi bàn cờ
+    đều có thể (N^N trạng thái). Hành động (r, c) đẩy hậu của hàng r về cột c dù nó đang ở
+    đâu, nên niềm tin sau hành động là {Result(s, (r, c)) | s thuộc niềm tin}. Đích là niềm
+    tin mà mọi bàn cờ trong đó đều là nghiệm.
+
+    Vũ trụ được đánh chỉ số theo ô: bit r*N + c bằng 1 nghĩa là hàng r có thể có hậu ở cột c.
+    Hành động chỉ tác động lên từng hàng độc lập nên mọi niềm tin đạt được là tích Descartes
+    các tập cột của từng hàng; N*N bit (một số nguyên) biểu diễn chính xác cả tập bàn cờ,
+    băm được và so sánh được trong O(1) với N nhỏ.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.full = full_mask(n)
+        self.initial = (1 << (n * n)) - 1
+
+    def square(self, r, c):
+        return r * self.n + c
+
+    def row_mask(self, belief, r):
+        """Các cột hàng r có thể có hậu trong niềm tin belief."""
+        return (belief >> (r * self.n)) & self.full
+
+    def size(self, belief):
+        """Số bàn cờ vật lý trong niềm tin."""
+        total = 1
+        for r in range(self.n):
+            total *= self.row_mask(belief, r).bit_count()
+        return total
+
+    def result(self, belief, r, c):
+        return (belief & ~(self.full << (r * self.n))) | (1 << self.square(r, c))
+
+    def pinned(self, belief):
+        """Các cặp (hàng, cột) của những hàng đã bị ép về đúng một cột."""
+        return [(r, mask.bit_length() - 1)
+                for r in range(self.n)
+                for mask in [self.row_mask(belief, r)]
+                if mask & (mask - 1) == 0]
+
+    def actions(self, belief):
+        """Các hành động (r, c) đáng thử từ niềm tin belief.
+
+        Bỏ qua hàng đã bị ép (ép lại không bao giờ cần cho kế hoạch ngắn nhất) và các cột
+        bị hậu đã ép tấn công (niềm tin đó chỉ tới được đích nếu ép lại hàng).
+        """
+        pinned = self.pinned(belief)
+        cols = 0
+        for _, pc in pinned:
+            cols |= 1 << pc
+        fixed = {r for r, _ in pinned}
+        for r in range(self.n):
+            if r in fixed:
+                continue
+            attacked = cols
+            for pr, pc in pinned:
+                dist = abs(r - pr)
+                attacked |= (1 << pc << dist) | (1 << pc >> dist)
+            for c in iter_columns(self.full & ~attacked):
+                yield r, c
+
+    def is_goal(self, belief):
+        """Mọi bàn cờ trong niềm tin là nghiệm: mọi hàng đã bị ép và không hậu nào tấn công nhau.
+
+        actions() không bao giờ ép vào ô bị tấn công nên chỉ cần kiểm tra số hàng đã ép.
+        """
+        return len(self.pinned(belief)) == self.n
 
-class BeliefStateSearchUI:
-    def __init__(self, root):
+    def board(self, belief):
+        return [self.row_mask(belief, r).bit_length() - 1 for r in range(self.n)]
+
+
+class BeliefStateSearchUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - Belief State Search (Simulation)")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - Belief State Search (Sensorless)")
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
         
@@ -23,109 +105,94 @@ class BeliefStateSearchUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Nhấn 'Solve' để bắt đầu", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
         self.draw_board()
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for r, c in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
         self.root.update_idletasks()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.lbl_status.config(text="Nhấn 'Solve' để bắt đầu")
 
     def update_status(self):
-        if self.solutions:
-            self.lbl_status.config(text=f"Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Solution {self.stream.progress()}")
         else:
             self.lbl_status.config(text="Đang giải...")
 
     def prepare_solutions(self):
+        if self.is_solving():
+            self.root.bell()
+            return
         self.clear_board()
         self.update_status()
-        self.solutions = self.solve_belief_state_search()
-        
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        self.stream = SolutionStream(self.iter_belief_state_solutions)
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
+    def show_solution(self, sol):
         self.queens = {(r, col) for r, col in enumerate(sol)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions: return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.stream is None or self.is_solving(): return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions: return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.stream is None or self.is_solving(): return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
     # --- Thuật toán Belief State Search ---
     
-    def is_safe(self, state, row, col):
-        for r, c in enumerate(state):
-            if c == col or abs(r - row) == abs(c - col):
-                return False
-        return True
-
     def solve_belief_state_search(self):
-        solutions = []
-        q = deque()
-        
-        initial_belief_state = [[]]
-        q.append(initial_belief_state)
+        return list(self.iter_belief_state_solutions())
+
+    def iter_belief_state_solutions(self, cancel=None):
+        """BFS trên không gian niềm tin, sinh bàn cờ của từng niềm tin đích.
+
+        Cùng một niềm tin đạt được theo nhiều thứ tự ép hàng (tới k! cách với k hàng đã ép),
+        bảng visited bảo đảm mỗi niềm tin chỉ được mở rộng một lần.
+        """
+        problem = SensorlessQueens(self.n)
+        q = deque([problem.initial])
+        visited = {problem.initial}
 
         while q:
-            current_belief_state = q.popleft()
-            
-            state = current_belief_state[0]
-            row = len(state)
+            check_cancelled(cancel)
+            belief = q.popleft()
 
-            if row == N:
-                solutions.append(state)
+            if problem.is_goal(belief):
+                yield problem.board(belief)
                 continue
 
-            for col in range(N):
-
-                if self.is_safe(state, row, col):
-                    new_state = state + [col]
-                    new_belief_state = [new_state]
-                    q.append(new_belief_state)
-        
-        return solutions
+            for r, c in problem.actions(belief):
+                new_belief = problem.result(belief, r, c)
+                if new_belief not in visited:
+                    visited.add(new_belief)
+                    q.append(new_belief)
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = BeliefStateSearchUI(root)
+    app = BeliefStateSearchUI(root, read_board_size(max_n=MAX_BELIEF_N))
     root.mainloop()
\ No newline at end of file
@@ -1,13 +1,23 @@
 import tkinter as tk
-from collections import deque 
+from itertools import chain
+
+from QueensCore import EMPTY_MASKS, iter_columns, free_mask, place, cell_size_for, read_board_size, SolutionStream, iter_solution_counts, mirror, is_fundamental, iter_parallel_solutions, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
 
 N = 8
 CELL_SIZE = 60
+SYMMETRY_REDUCTION = True  # chỉ duyệt nửa bàn cờ ở hàng đầu, nửa còn lại suy ra bằng phép lật
+PARALLEL_MIN_N = 12  # từ N này trở lên chia việc cho nhiều tiến trình
+PARALLEL_WORKERS = None  # None: dùng tất cả các lõi CPU
+PARALLEL_PREFIX_ROWS = 2  # mỗi tác vụ là một tiền tố gồm 2 hàng đầu
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -18,46 +28,44 @@ class EightQueensUI:
         btn_solve = tk.Button(frame_top, text="Solve DFS", width=10, command=self.prepare_solutions)
         btn_solve.pack(side=tk.LEFT, padx=5)
 
+        btn_count = tk.Button(frame_top, text="Count", width=10, command=self.start_count)
+        btn_count.pack(side=tk.LEFT, padx=5)
+
         btn_prev = tk.Button(frame_top, text="Previous", width=10, command=self.prev_solution)
         btn_prev.pack(side=tk.LEFT, padx=5)
 
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
+        self.fundamental_only = tk.BooleanVar(value=False)
+        chk_fundamental = tk.Checkbutton(frame_top, text="Chỉ nghiệm cơ bản", variable=self.fundamental_only)
+        chk_fundamental.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -65,75 +73,151 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
     # --- Giải thuật DFS  ---
 
-    def is_safe(self, current_solution, row, col):
-        for r, c in enumerate(current_solution):
-            if c == col or abs(r - row) == abs(c - col):
-                return False
-        return True
-
-    def dfs_all_solutions(self):
-        solutions = []
-        def _solve_recursively(current_solution, row):
-            if row == N:
-                solutions.append(list(current_solution))
+    def dfs_all_solutions(self, symmetric=SYMMETRY_REDUCTION, fundamental=False):
+        """fundamental=True: chỉ trả về các nghiệm cơ bản (12 nghiệm với N = 8)."""
+        return list(self.iter_dfs_all_solutions(symmetric, fundamental))
+
+    def iter_dfs_all_solutions(self, symmetric=SYMMETRY_REDUCTION, fundamental=False, cancel=None):
+        """Nguồn nghiệm của nút Solve: duyệt nửa bàn cờ khi bật đối xứng, song song khi N lớn.
+
+        cancel (threading.Event): đặt lên thì generator dừng bằng SearchCancelled.
+        """
+        if symmetric or fundamental:
+            return self.iter_dfs_symmetric_solutions(fundamental, cancel)
+        return self.iter_dfs_solutions_from(range(self.n), cancel)
+
+    def dfs_solutions_from(self, first_cols):
+        """DFS với quân hậu hàng đầu chỉ được đặt ở các cột first_cols."""
+        return list(self.iter_dfs_solutions_from(first_cols))
+
+    def iter_dfs_solutions_from(self, first_cols, cancel=None):
+        if self.n >= PARALLEL_MIN_N:
+            return iter_parallel_solutions(self.n, first_cols, PARALLEL_PREFIX_ROWS, PARALLEL_WORKERS, cancel=cancel)
+        return self.iter_dfs_solutions(first_cols, cancel)
+
+    def iter_dfs_solutions(self, first_cols=None, cancel=None):
+        """Sinh lần lượt từng nghiệm DFS theo thứ tự từ điển, không dựng sẵn cả danh sách."""
+        if first_cols is None:
+            first_cols = range(self.n)
+
+        def _solve_recursively(current_solution, row, masks):
+            check_cancelled(cancel)
+            if row == self.n:
+                yield list(current_solution)
                 return
-            for col in range(N):
-                if self.is_safe(current_solution, row, col):
-                    current_solution.append(col)
-                    _solve_recursively(current_solution, row + 1)
-                    current_solution.pop()
+            for col in iter_columns(free_mask(self.n, masks)):
+                current_solution.append(col)
+                yield from _solve_recursively(current_solution, row + 1, place(self.n, masks, col))
+                current_solution.pop()
+
+        for col in first_cols:
+            yield from _solve_recursively([col], 1, place(self.n, EMPTY_MASKS, col))
+
+    def dfs_symmetric_solutions(self, fundamental=False):
+        return list(self.iter_dfs_symmetric_solutions(fundamental))
+
+    def iter_dfs_symmetric_solutions(self, fundamental=False, cancel=None):
+        """Chỉ duyệt các cột hàng đầu < N/2 và cột giữa (N lẻ), nửa phải suy ra bằng phép lật.
+
+        Mỗi nghiệm nửa trái được sinh kèm ngay ảnh lật của nó nên không phải giữ lại
+        nghiệm nào, đổi lại thứ tự không còn là thứ tự từ điển.
+        """
+        half = self.n // 2
+        left_half = self.iter_dfs_solutions_from(range(half), cancel)
+        middle = self.iter_dfs_solutions_from(range(half, self.n - half), cancel)
+        if fundamental:
+            # Nghiệm nhỏ nhất trong nhóm đối xứng luôn có cột hàng đầu <= cột giữa
+            for sol in chain(left_half, middle):
+                if is_fundamental(self.n, sol):
+                    yield sol
+            return
+        for sol in left_half:
+            yield sol
+            yield mirror(self.n, sol)
+        yield from middle
 
-        _solve_recursively([], 0)
-        return solutions
+    # --- Đếm nghiệm ---
 
-    # --- Hiển thị nghiệm ---
+    def iter_dfs_counts(self, cancel=None):
+        """Sinh số nghiệm DFS cộng dồn theo từng tiền tố hàng đầu, không dựng danh sách nghiệm nào."""
+        prefix_rows = PARALLEL_PREFIX_ROWS if self.n >= PARALLEL_MIN_N else None
+        return iter_solution_counts(self.n, None, prefix_rows, PARALLEL_WORKERS, cancel)
 
-    def prepare_solutions(self):
-        self.solutions = self.dfs_all_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
+    def start_count(self):
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.solution_count = 0
+        self.lbl_status.config(text="Đang đếm...")
+        self.start_task(self.iter_dfs_counts, self.on_count_progress, self.on_count_finished)
+
+    def on_count_progress(self, count):
+        self.solution_count = count
+        self.lbl_status.config(text=f"Đang đếm... {count} nghiệm")
+
+    def on_count_finished(self, cancelled):
+        if cancelled:
+            self.lbl_status.config(text="Đã huỷ!")
         else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+            self.lbl_status.config(text=f"Số nghiệm {self.n} hậu: {self.solution_count}")
+
+    # --- Hiển thị nghiệm ---
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
-        self.queens = {(r, sol[r]) for r in range(N)}
+    def prepare_solutions(self):
+        if self.is_solving():
+            self.root.bell()
+            return
+        # Đọc checkbox một lần trên luồng Tk: factory còn được gọi lại trên luồng phụ khi quay vòng
+        fundamental = self.fundamental_only.get()
+        self.stream = SolutionStream(lambda cancel: self.iter_dfs_all_solutions(fundamental=fundamental, cancel=cancel))
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
+
+    def show_solution(self, sol):
+        self.queens = {(r, sol[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve DFS trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve DFS trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
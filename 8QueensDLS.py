@@ -1,13 +1,23 @@
 import tkinter as tk
 
+from QueensCore import EMPTY_MASKS, iter_columns, free_mask, place, cell_size_for, read_board_size, SolutionStream, iter_solution_counts, iter_parallel_solutions, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
+
 N = 8
 CELL_SIZE = 60
-DEPTH_LIMIT = 8 
+DEPTH_LIMIT = None  # None: giới hạn độ sâu bằng N
+PARALLEL_MIN_N = 12  # từ N này trở lên chia việc cho nhiều tiến trình
+PARALLEL_WORKERS = None  # None: dùng tất cả các lõi CPU
+PARALLEL_PREFIX_ROWS = 2  # mỗi tác vụ là một tiền tố gồm 2 hàng đầu
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.depth_limit = n if DEPTH_LIMIT is None else DEPTH_LIMIT
+        self.root.title(f"{self.n} Queens Puzzle")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -18,46 +28,40 @@ class EightQueensUI:
         btn_solve = tk.Button(frame_top, text="Solve DLS", width=10, command=self.prepare_solutions)
         btn_solve.pack(side=tk.LEFT, padx=5)
 
+        btn_count = tk.Button(frame_top, text="Count", width=10, command=self.start_count)
+        btn_count.pack(side=tk.LEFT, padx=5)
+
         btn_prev = tk.Button(frame_top, text="Previous", width=10, command=self.prev_solution)
         btn_prev.pack(side=tk.LEFT, padx=5)
 
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -65,80 +69,112 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
     # --- Giải thuật DLS ---
 
-    def is_safe(self, state, row, col):
-        """Hàm is_safe giữ nguyên như các phiên bản trước."""
-        for r, c in enumerate(state):
-            if c == col or abs(r - row) == abs(c - col):
-                return False
-        return True
-
     def dls_all_solutions(self):
         """Hàm khởi tạo và trả về tất cả các nghiệm tìm được bằng DLS."""
-        solutions = []
-        
-        def _solve_recursively(current_solution, depth):
-            if depth == N:
-                solutions.append(list(current_solution))
+        return list(self.iter_dls_all_solutions())
+
+    def iter_dls_all_solutions(self, cancel=None):
+        """Nguồn nghiệm của nút Solve: từ PARALLEL_MIN_N chia theo tiền tố cho nhiều tiến trình."""
+        if self.n >= PARALLEL_MIN_N:
+            return iter_parallel_solutions(self.n, None, PARALLEL_PREFIX_ROWS, PARALLEL_WORKERS, self.depth_limit, cancel)
+        return self.iter_dls_solutions(cancel)
+
+    def iter_dls_solutions(self, cancel=None):
+        """Sinh lần lượt từng nghiệm DLS, không dựng sẵn cả danh sách."""
+        def _solve_recursively(current_solution, depth, masks):
+            check_cancelled(cancel)
+            if depth == self.n:
+                yield list(current_solution)
                 return
-            if depth >= DEPTH_LIMIT:
+            if depth >= self.depth_limit:
                 return
-            for col in range(N):
-                if self.is_safe(current_solution, depth, col):
-                    current_solution.append(col)
-                    _solve_recursively(current_solution, depth + 1)
-                    current_solution.pop() 
+            for col in iter_columns(free_mask(self.n, masks)):
+                current_solution.append(col)
+                yield from _solve_recursively(current_solution, depth + 1, place(self.n, masks, col))
+                current_solution.pop() 
+
+        yield from _solve_recursively([], 0, EMPTY_MASKS)
+
+    # --- Đếm nghiệm ---
+
+    def iter_dls_counts(self, cancel=None):
+        """Sinh số nghiệm DLS cộng dồn theo từng tiền tố hàng đầu, không dựng danh sách nghiệm nào."""
+        prefix_rows = PARALLEL_PREFIX_ROWS if self.n >= PARALLEL_MIN_N else None
+        return iter_solution_counts(self.n, self.depth_limit, prefix_rows, PARALLEL_WORKERS, cancel)
+
+    def start_count(self):
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.solution_count = 0
+        self.lbl_status.config(text="Đang đếm...")
+        self.start_task(self.iter_dls_counts, self.on_count_progress, self.on_count_finished)
+
+    def on_count_progress(self, count):
+        self.solution_count = count
+        self.lbl_status.config(text=f"Đang đếm... {count} nghiệm")
 
-        _solve_recursively([], 0)
-        return solutions
+    def on_count_finished(self, cancelled):
+        if cancelled:
+            self.lbl_status.config(text="Đã huỷ!")
+        else:
+            self.lbl_status.config(text=f"Số nghiệm {self.n} hậu: {self.solution_count}")
 
     # --- Hiển thị nghiệm  ---
 
     def prepare_solutions(self):
-        self.solutions = self.dls_all_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_dls_all_solutions)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
-        self.queens = {(r, sol[r]) for r in range(N)}
+    def show_solution(self, sol):
+        self.queens = {(r, sol[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve DLS trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve DLS trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
@@ -1,6 +1,10 @@
 import tkinter as tk
 import time
 import random
+import queue
+
+from QueensCore import cell_size_for, read_board_size, count_conflicts, process_context
+from QueensUI import BoardCanvas, StepSolverMixin
 
 N = 8
 CELL_SIZE = 60
@@ -10,85 +14,25 @@ MAX_GENERATIONS = 1000
 MUTATION_RATE = 0.15 
 TOURNAMENT_SIZE = 5
 
-MAX_FITNESS = (N * (N - 1)) // 2 
-
-class GeneticAlgorithmUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("8 Queens Puzzle - Free Placement Genetic Algorithm")
+# Chế độ đảo: mỗi đảo là một quần thể POPULATION_SIZE chạy trên tiến trình riêng
+ISLANDS = 4
+MIGRATION_INTERVAL = 20  # số thế hệ giữa hai lần di cư
+MIGRATION_SIZE = 5       # số cá thể tốt nhất gửi sang đảo kế tiếp mỗi lần
+ISLAND_POLL_SECONDS = 0.5
 
-        frame_top = tk.Frame(root, pady=5)
-        frame_top.pack()
-        
-        btn_clear = tk.Button(frame_top, text="Clear Board", width=15, command=self.clear_board)
-        btn_clear.pack(side=tk.LEFT, padx=5)
-        
-        btn_solve = tk.Button(frame_top, text="Solve Genetic Algorithm", width=25, command=self.solve_genetic_algorithm)
-        btn_solve.pack(side=tk.LEFT, padx=5)
-        
-        self.lbl_status = tk.Label(frame_top, text="Click để đặt tối đa 8 quân hậu", font=("Arial", 10, "bold"))
-        self.lbl_status.pack(side=tk.LEFT, padx=10)
-
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
-        self.canvas.pack()
+class GeneticAlgorithm:
+    """Phần thuật toán di truyền không dính tới Tk, dùng chung cho giao diện và các tiến trình đảo."""
 
-        self.user_state = []
+    def __init__(self, n):
+        self.n = n
+        self.max_fitness = (n * (n - 1)) // 2
         self.population = []
         self.best_individual = []
-        
-        self.canvas.bind("<Button-1>", self.on_click)
-        self.draw_board([])
-
-    def draw_board(self, individual):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for r, c in individual:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
-        self.root.update_idletasks()
-        
-    def on_click(self, event):
-        col = event.x // CELL_SIZE
-        row = event.y // CELL_SIZE
-        pos = (row, col)
-
-        if pos in self.user_state:
-            self.user_state.remove(pos)
-        elif len(self.user_state) < 8:
-            self.user_state.append(pos)
-        else:
-            self.root.bell()
-
-        self.draw_board(self.user_state)
-        self.update_status_initial()
-
-    def clear_board(self):
-        self.user_state = []
-        self.best_individual = []
-        self.population = []
-        self.draw_board([])
-        self.lbl_status.config(text="Click để đặt tối đa 8 quân hậu")
-
-    def update_status_initial(self):
-        placed_queens = len(self.user_state)
-        fitness = self.calculate_fitness(self.user_state)
-        self.lbl_status.config(text=f"Đã đặt: {placed_queens}/8 | Fitness ban đầu: {fitness}/{MAX_FITNESS}")
-
-    def update_status_solving(self, generation, fitness):
-        self.lbl_status.config(text=f"Thế hệ: {generation} | Fitness tốt nhất: {fitness}/{MAX_FITNESS}")
+        self.fitness_cache = {}  # frozenset các ô -> fitness, chỉ giữ cá thể của thế hệ hiện tại
+        self.immigrants = []  # cá thể từ đảo khác, thay cho các con cuối ở thế hệ sau
 
-    # --- Thuật toán Di truyền ---
-    
     def calculate_fitness(self, individual):
-        if len(individual) != 8:
+        if len(individual) != self.n:
             return 0
         clashes = 0
         for i in range(len(individual)):
@@ -97,65 +41,84 @@ class GeneticAlgorithmUI:
                 r2, c2 = individual[j]
                 if r1 == r2 or c1 == c2 or abs(r1 - r2) == abs(c1 - c2):
                     clashes += 1
-        return MAX_FITNESS - clashes
+        return self.max_fitness - clashes
 
-    def initialize_population_from_user_state(self):
-        self.population = [list(self.user_state)]
+    def initialize_population(self, seed_individual):
+        self.population = [list(seed_individual)]
         
         while len(self.population) < POPULATION_SIZE:
-            mutated_individual = list(self.user_state)
+            mutated_individual = list(seed_individual)
             for _ in range(random.randint(1, 3)): 
-                if not mutated_individual: continue
+                if not self.has_free_square(mutated_individual): continue
                 idx_to_mutate = random.randrange(len(mutated_individual))
 
-                new_pos = (random.randint(0, N-1), random.randint(0, N-1))
+                new_pos = (random.randint(0, self.n-1), random.randint(0, self.n-1))
                 while new_pos in mutated_individual:
-                    new_pos = (random.randint(0, N-1), random.randint(0, N-1))
+                    new_pos = (random.randint(0, self.n-1), random.randint(0, self.n-1))
                 
                 mutated_individual[idx_to_mutate] = new_pos
             self.population.append(mutated_individual)
 
-    def selection(self):
-        tournament = random.sample(self.population, TOURNAMENT_SIZE)
-        return max(tournament, key=self.calculate_fitness)
+    def population_fitness(self, population):
+        """Vector fitness của cả quần thể, tính một lượt cho mỗi thế hệ.
+
+        Fitness chỉ phụ thuộc tập ô nên cá thể được nhớ theo frozenset: cá thể ưu tú
+        và con trùng bộ gen với cá thể đã có không bị tính lại. Bộ nhớ chỉ giữ
+        các cá thể của thế hệ vừa tính nên kích thước không vượt quá quần thể.
+        """
+        cache = self.fitness_cache
+        keys = [frozenset(individual) for individual in population]
+        misses = {}
+        for key, individual in zip(keys, population):
+            if key not in cache and key not in misses:
+                misses[key] = individual
+        for key, clashes in zip(misses, count_conflicts(self.n, list(misses.values()))):
+            cache[key] = self.max_fitness - clashes
+        fitness = [cache[key] for key in keys]
+        self.fitness_cache = {key: cache[key] for key in keys}
+        return fitness
+
+    def selection(self, fitness):
+        # Bốc chỉ số thay vì cá thể: random.sample tiêu thụ số ngẫu nhiên như nhau nên kết quả không đổi
+        tournament = random.sample(range(len(self.population)), TOURNAMENT_SIZE)
+        return self.population[max(tournament, key=fitness.__getitem__)]
 
     def crossover(self, parent1, parent2):
-        crossover_point = random.randint(1, N - 1)
+        crossover_point = random.randint(1, self.n - 1)
         child = parent1[:crossover_point] + parent2[crossover_point:]
         child = list(set(child)) 
-        while len(child) < N:
-            new_pos = (random.randint(0, N-1), random.randint(0, N-1))
+        while len(child) < self.n:
+            new_pos = (random.randint(0, self.n-1), random.randint(0, self.n-1))
             if new_pos not in child:
                 child.append(new_pos)
         
-        return child[:N]
+        return child[:self.n]
+
+    def has_free_square(self, individual):
+        """Còn ô trống để dời hậu tới không (bàn 1x1 thì không, vòng chọn ô sẽ lặp mãi)."""
+        return 0 < len(individual) < self.n * self.n
 
     def mutate(self, individual):
-        if random.random() < MUTATION_RATE:
+        if random.random() < MUTATION_RATE and self.has_free_square(individual):
             idx_to_mutate = random.randrange(len(individual))
-            new_pos = (random.randint(0, N-1), random.randint(0, N-1))
+            new_pos = (random.randint(0, self.n-1), random.randint(0, self.n-1))
             while new_pos in individual:
-                new_pos = (random.randint(0, N-1), random.randint(0, N-1))
+                new_pos = (random.randint(0, self.n-1), random.randint(0, self.n-1))
             individual[idx_to_mutate] = new_pos
         return individual
 
-    def solve_genetic_algorithm(self):
-        if len(self.user_state) != 8:
-            self.lbl_status.config(text="Lỗi: Vui lòng đặt đủ 8 quân hậu trước khi giải!")
-            return
-
-        self.initialize_population_from_user_state()
-
-        for generation in range(1, MAX_GENERATIONS + 1):
-            self.population.sort(key=self.calculate_fitness, reverse=True)
+    def evolve(self, generations):
+        """Sinh (thế hệ, fitness tốt nhất) sau khi chấm điểm và sắp xếp mỗi thế hệ, trước khi lai ghép."""
+        for generation in range(1, generations + 1):
+            fitness = self.population_fitness(self.population)
+            order = sorted(range(len(self.population)), key=fitness.__getitem__, reverse=True)
+            self.population = [self.population[i] for i in order]
+            fitness = [fitness[i] for i in order]
             self.best_individual = self.population[0]
-            best_fitness = self.calculate_fitness(self.best_individual)
-            
-            self.draw_board(self.best_individual)
-            self.update_status_solving(generation, best_fitness)
+            best_fitness = fitness[0]
 
-            if best_fitness == MAX_FITNESS:
-                self.lbl_status.config(text=f"Đã tìm thấy lời giải ở thế hệ {generation}! Fitness: {MAX_FITNESS}")
+            yield generation, best_fitness
+            if best_fitness == self.max_fitness:
                 return
 
             new_population = []
@@ -163,18 +126,202 @@ class GeneticAlgorithmUI:
             new_population.extend(self.population[:elite_count])
 
             while len(new_population) < POPULATION_SIZE:
-                parent1 = self.selection()
-                parent2 = self.selection()
+                parent1 = self.selection(fitness)
+                parent2 = self.selection(fitness)
                 child = self.crossover(parent1, parent2)
                 child = self.mutate(child)
                 new_population.append(child)
 
+            if self.immigrants:
+                new_population[-len(self.immigrants):] = self.immigrants
+                self.immigrants = []
             self.population = new_population
+
+
+def run_island(n, seed_individual, rng_seed, island, inbox, outbox, reports, stop_event):
+    """Vòng tiến hoá của một đảo (chạy trong tiến trình con).
+
+    Mỗi thế hệ gửi (đảo, thế hệ, cá thể tốt nhất, fitness) về reports; cứ
+    MIGRATION_INTERVAL thế hệ lại gửi MIGRATION_SIZE cá thể tốt nhất sang đảo kế
+    tiếp qua outbox. Đảo nào tìm được lời giải thì bật stop_event để mọi đảo dừng.
+    """
+    random.seed(rng_seed)
+    ga = GeneticAlgorithm(n)
+    ga.initialize_population(seed_individual)
+    for generation, best_fitness in ga.evolve(MAX_GENERATIONS):
+        if stop_event.is_set():
+            break
+        reports.put((island, generation, list(ga.best_individual), best_fitness))
+        if best_fitness == ga.max_fitness:
+            stop_event.set()
+            break
+        if generation % MIGRATION_INTERVAL == 0:
+            outbox.put([list(individual) for individual in ga.population[:MIGRATION_SIZE]])
+        try:
+            ga.immigrants = inbox.get_nowait()
+        except queue.Empty:
+            pass
+    reports.put((island, None, None, None))
+
+
+class GeneticAlgorithmUI(StepSolverMixin):
+    def __init__(self, root, n=N):
+        self.root = root
+        self.n = n
+        self.max_fitness = GeneticAlgorithm(n).max_fitness
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - Free Placement Genetic Algorithm")
+
+        frame_top = tk.Frame(root, pady=5)
+        frame_top.pack()
+        
+        btn_clear = tk.Button(frame_top, text="Clear Board", width=15, command=self.clear_board)
+        btn_clear.pack(side=tk.LEFT, padx=5)
+        
+        btn_solve = tk.Button(frame_top, text="Solve Genetic Algorithm", width=25, command=self.solve_genetic_algorithm)
+        btn_solve.pack(side=tk.LEFT, padx=5)
+
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
+        self.island_mode = tk.BooleanVar(value=False)
+        chk_islands = tk.Checkbutton(frame_top, text=f"{ISLANDS} đảo song song", variable=self.island_mode)
+        chk_islands.pack(side=tk.LEFT, padx=5)
+        
+        self.lbl_status = tk.Label(frame_top, text=f"Click để đặt tối đa {self.n} quân hậu", font=("Arial", 10, "bold"))
+        self.lbl_status.pack(side=tk.LEFT, padx=10)
+
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
+        self.canvas.pack()
+
+        self.user_state = []
+        self.task = None
+        
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.draw_board([])
+
+    def draw_board(self, individual):
+        self.canvas.show_queens(individual)
+        self.root.update_idletasks()
+        
+    def on_click(self, event):
+        if self.is_solving():
+            self.root.bell()
+            return
+        col = event.x // self.cell_size
+        row = event.y // self.cell_size
+        pos = (row, col)
+
+        if pos in self.user_state:
+            self.user_state.remove(pos)
+        elif len(self.user_state) < self.n:
+            self.user_state.append(pos)
+        else:
+            self.root.bell()
+
+        self.draw_board(self.user_state)
+        self.update_status_initial()
+
+    def clear_board(self):
+        self.cancel_solve()
+        self.user_state = []
+        self.draw_board([])
+        self.lbl_status.config(text=f"Click để đặt tối đa {self.n} quân hậu")
+
+    def update_status_initial(self):
+        placed_queens = len(self.user_state)
+        fitness = GeneticAlgorithm(self.n).calculate_fitness(self.user_state)
+        self.lbl_status.config(text=f"Đã đặt: {placed_queens}/{self.n} | Fitness ban đầu: {fitness}/{self.max_fitness}")
+
+    def solving_status(self, generation, fitness):
+        return f"Thế hệ: {generation} | Fitness tốt nhất: {fitness}/{self.max_fitness}"
+
+    def on_solver_step(self, step):
+        individual, message = step
+        self.draw_board(individual)
+        self.lbl_status.config(text=message)
+
+    def solve_genetic_algorithm(self):
+        if self.is_solving():
+            self.root.bell()
+            return
+        if len(self.user_state) != self.n:
+            self.lbl_status.config(text=f"Lỗi: Vui lòng đặt đủ {self.n} quân hậu trước khi giải!")
+            return
+
+        steps = self.island_steps if self.island_mode.get() else self.genetic_algorithm_steps
+        seed_individual = list(self.user_state)
+        self.run_solver(lambda: steps(seed_individual))
+
+    def genetic_algorithm_steps(self, seed_individual):
+        """Sinh (cá thể tốt nhất, thông báo) sau mỗi thế hệ; chạy trên luồng phụ nên không chạm vào Tk.
+
+        Mỗi lần giải dùng một GeneticAlgorithm riêng: luồng của lần giải đã huỷ có thể
+        còn chạy nốt tới lần sinh kế tiếp và không được ghi đè quần thể của lần giải mới.
+        """
+        ga = GeneticAlgorithm(self.n)
+        ga.initialize_population(seed_individual)
+
+        for generation, best_fitness in ga.evolve(MAX_GENERATIONS):
+            if best_fitness == self.max_fitness:
+                yield list(ga.best_individual), f"Đã tìm thấy lời giải ở thế hệ {generation}! Fitness: {self.max_fitness}"
+                return
+            yield list(ga.best_individual), self.solving_status(generation, best_fitness)
         
-        self.lbl_status.config(text=f"Kết thúc sau {MAX_GENERATIONS} thế hệ. Fitness tốt nhất: {best_fitness}")
+        yield list(ga.best_individual), f"Kết thúc sau {MAX_GENERATIONS} thế hệ. Fitness tốt nhất: {best_fitness}"
+
+    def island_steps(self, seed_individual):
+        """Như genetic_algorithm_steps nhưng tiến hoá ISLANDS quần thể trên các tiến trình riêng,
+        di cư theo vòng: đảo k gửi cá thể tốt nhất sang đảo k+1."""
+        context = process_context()
+        reports = context.Queue()
+        stop_event = context.Event()
+        inboxes = [context.Queue() for _ in range(ISLANDS)]
+        processes = [
+            context.Process(
+                target=run_island,
+                args=(self.n, seed_individual, random.randrange(2 ** 32), island,
+                      inboxes[island], inboxes[(island + 1) % ISLANDS], reports, stop_event),
+                daemon=True)
+            for island in range(ISLANDS)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            best_individual = list(seed_individual)
+            best_fitness = GeneticAlgorithm(self.n).calculate_fitness(best_individual)
+            finished = 0
+            while finished < ISLANDS:
+                try:
+                    island, generation, individual, fitness = reports.get(timeout=ISLAND_POLL_SECONDS)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        # Tiến trình đã thoát mà không gửi thông báo kết thúc: đảo bị lỗi
+                        yield best_individual, f"Lỗi: {ISLANDS - finished}/{ISLANDS} đảo dừng bất thường. Fitness tốt nhất: {best_fitness}"
+                        return
+                    continue
+                if generation is None:
+                    finished += 1
+                    continue
+                if fitness > best_fitness:
+                    best_individual, best_fitness = individual, fitness
+                if fitness == self.max_fitness:
+                    yield individual, f"Đảo {island + 1} tìm thấy lời giải ở thế hệ {generation}! Fitness: {self.max_fitness}"
+                    return
+                yield best_individual, f"Đảo {island + 1}/{ISLANDS} | " + self.solving_status(generation, best_fitness)
+
+            yield best_individual, f"Kết thúc sau {MAX_GENERATIONS} thế hệ trên {ISLANDS} đảo. Fitness tốt nhất: {best_fitness}"
+        finally:
+            stop_event.set()
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = GeneticAlgorithmUI(root)
+    app = GeneticAlgorithmUI(root, read_board_size(max_n=None))
     root.mainloop() 
\ No newline at end of file
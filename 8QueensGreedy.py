@@ -1,13 +1,19 @@
 import tkinter as tk
 import heapq
 
+from QueensCore import EMPTY_MASKS, iter_columns, free_mask, place, remaining_attacks, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
+
 N = 8
 CELL_SIZE = 60
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -25,40 +31,31 @@ class EightQueensUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -66,96 +63,85 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
     # --- Giải thuật Greedy  ---
 
-    def is_safe(self, state, row, col):
-        for r, c in enumerate(state):
-            if c == col or abs(r - row) == abs(c - col):
-                return False
-        return True
-
-    def hn(self, state):
-        num_placed = len(state)
-        if num_placed == N:
-            return 0
-        attacked_squares = set()
-        for r, c in enumerate(state):
-            for i in range(num_placed, N):
-                attacked_squares.add((i, c))
-                if 0 <= c + (i - r) < N:
-                    attacked_squares.add((i, c + (i - r)))
-                if 0 <= c - (i - r) < N:
-                    attacked_squares.add((i, c - (i - r)))
-        
-        return len(attacked_squares)
+    def hn(self, masks):
+        """h(n): số ô bị tấn công ở các hàng còn lại, đọc từ bộ mask của nút."""
+        return remaining_attacks(self.n, masks)
 
 
     def greedy_all_solutions(self):
-        solutions = []
-        pq = [(0, [])] 
+        return list(self.iter_greedy_solutions())
+
+    def iter_greedy_solutions(self, cancel=None):
+        """Sinh lần lượt từng nghiệm theo thứ tự lấy ra khỏi hàng đợi ưu tiên h(n)."""
+        pq = [(0, [], EMPTY_MASKS)] 
         
         while pq:
-            cost, state = heapq.heappop(pq)
+            check_cancelled(cancel)
+            cost, state, masks = heapq.heappop(pq)
             row = len(state)
 
-            if row == N:
-                solutions.append(state)
+            if row == self.n:
+                yield state
                 continue
-            potential_moves = []
-            for col in range(N):
-                if self.is_safe(state, row, col):
-                    new_state = state + [col]
-                    h_cost = self.hn(new_state)
-                    heapq.heappush(pq, (h_cost, new_state))
-        
-        return solutions
+            for col in iter_columns(free_mask(self.n, masks)):
+                child_masks = place(self.n, masks, col)
+                heapq.heappush(pq, (self.hn(child_masks), state + [col], child_masks))
 
     # --- Hiển thị nghiệm  ---
 
     def prepare_solutions(self):
-        self.solutions = self.greedy_all_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_greedy_solutions)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
-        self.queens = {(r, sol[r]) for r in range(N)}
+    def show_solution(self, sol):
+        self.queens = {(r, sol[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve Greedy trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve Greedy trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
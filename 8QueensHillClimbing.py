@@ -1,13 +1,20 @@
 import tkinter as tk
 import time
 
+from QueensCore import cell_size_for, read_board_size, ConflictCounter
+from QueensUI import BoardCanvas, StepSolverMixin
+
 N = 8
 CELL_SIZE = 60
+STEP_DELAY = 0.1  # giây nghỉ giữa các bước để kịp quan sát
 
-class HillClimbingUI:
-    def __init__(self, root):
+class HillClimbingUI(StepSolverMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - Free Placement Hill Climbing")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - Free Placement Hill Climbing")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -17,43 +24,38 @@ class HillClimbingUI:
         
         btn_solve = tk.Button(frame_top, text="Solve Hill Climbing", width=20, command=self.solve_hill_climbing)
         btn_solve.pack(side=tk.LEFT, padx=5)
+
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
         
-        self.lbl_status = tk.Label(frame_top, text="Click để đặt tối đa 8 quân hậu", font=("Arial", 10, "bold"))
+        self.lbl_status = tk.Label(frame_top, text=f"Click để đặt tối đa {self.n} quân hậu", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.state = []
+        self.task = None
         
         self.canvas.bind("<Button-1>", self.on_click)
         self.draw_board()
 
     def draw_board(self):
 
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for r, c in self.state:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.state)
         self.root.update_idletasks()
         
     def on_click(self, event):
-        col = event.x // CELL_SIZE
-        row = event.y // CELL_SIZE
+        if self.is_solving():
+            self.root.bell()
+            return
+        col = event.x // self.cell_size
+        row = event.y // self.cell_size
         pos = (row, col)
 
         if pos in self.state:
             self.state.remove(pos)
-        elif len(self.state) < 8:
+        elif len(self.state) < self.n:
             self.state.append(pos)
         else:
             self.root.bell() 
@@ -62,6 +64,7 @@ class HillClimbingUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.state = []
         self.draw_board()
         self.update_status()
@@ -69,7 +72,7 @@ class HillClimbingUI:
     def update_status(self):
         """Cập nhật dòng trạng thái."""
         cost = self.calculate_cost(self.state)
-        self.lbl_status.config(text=f"Đã đặt: {len(self.state)}/8 quân hậu | Chi phí hiện tại: {cost}")
+        self.lbl_status.config(text=f"Đã đặt: {len(self.state)}/{self.n} quân hậu | Chi phí hiện tại: {cost}")
 
     # --- Giải thuật Hill Climbing ---
     
@@ -85,50 +88,75 @@ class HillClimbingUI:
         return cost
 
     def solve_hill_climbing(self):
-        if len(self.state) != 8:
-            self.lbl_status.config(text="Lỗi: Vui lòng đặt đủ 8 quân hậu trước khi giải!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        if len(self.state) != self.n:
+            self.lbl_status.config(text=f"Lỗi: Vui lòng đặt đủ {self.n} quân hậu trước khi giải!")
             return
 
-        current_state = list(self.state)
-        
-        while True:
-            current_cost = self.calculate_cost(current_state)
-            self.state = current_state
-            self.draw_board()
-            self.lbl_status.config(text=f"Đang tìm... Chi phí hiện tại: {current_cost}")
-            time.sleep(0.1) 
+        start_state = list(self.state)
+        self.run_solver(lambda: self.hill_climbing_steps(start_state))
 
+    def on_solver_step(self, step):
+        self.state, message = step
+        self.draw_board()
+        self.lbl_status.config(text=message)
+
+    def hill_climbing_steps(self, current_state):
+        """Sinh (trạng thái, thông báo) sau mỗi bước leo đồi; chạy trên luồng phụ nên không chạm vào Tk.
+
+        Chi phí của mọi láng giềng lấy từ bảng attacks của ConflictCounter trong O(1),
+        nên một bước là O(N^3) thay vì tính lại calculate_cost O(N^2) cho từng láng giềng.
+        """
+        n = self.n
+        current_state = list(current_state)
+        counter = ConflictCounter(n, current_state, with_table=True)
+        table = counter.table
+        occupied = set(current_state)
+
+        while True:
+            current_cost = counter.cost
             if current_cost == 0:
-                self.lbl_status.config(text=f"Đã tìm thấy lời giải! Chi phí: 0")
+                yield list(current_state), f"Đã tìm thấy lời giải! Chi phí: 0"
                 return
+            yield list(current_state), f"Đang tìm... Chi phí hiện tại: {current_cost}"
+            time.sleep(STEP_DELAY) 
 
-            best_neighbor = None
+            best_move = None
             best_neighbor_cost = current_cost
 
-            for i in range(len(current_state)):
-                original_pos = current_state[i]
+            # Duyệt theo thứ tự (quân hậu, hàng, cột) như cũ và chỉ nhận láng giềng tốt hơn hẳn,
+            # nên vẫn chọn đúng láng giềng tốt nhất đầu tiên
+            for i, (r_old, c_old) in enumerate(current_state):
+                base = current_cost + 4 - table[r_old * n + c_old]
+                d_old, a_old = r_old - c_old, r_old + c_old
                 
-                for r_new in range(N):
-                    for c_new in range(N):
-                        new_pos = (r_new, c_new)
-                        if new_pos in current_state:
-                            continue 
-                        neighbor_state = list(current_state)
-                        neighbor_state[i] = new_pos
-                        neighbor_cost = self.calculate_cost(neighbor_state)
-                        
-                        if neighbor_cost < best_neighbor_cost:
+                for r_new in range(n):
+                    row_shared = r_new == r_old
+                    row_offset = r_new * n
+                    for c_new in range(n):
+                        neighbor_cost = base + table[row_offset + c_new]
+                        if neighbor_cost > best_neighbor_cost:
+                            continue
+                        if row_shared or c_new == c_old or r_new - c_new == d_old or r_new + c_new == a_old:
+                            neighbor_cost -= 1
+                        if neighbor_cost < best_neighbor_cost and (r_new, c_new) not in occupied:
                             best_neighbor_cost = neighbor_cost
-                            best_neighbor = list(neighbor_state)
+                            best_move = (i, (r_new, c_new))
             
             if best_neighbor_cost >= current_cost:
-                self.lbl_status.config(text=f"Bị kẹt ở đỉnh cục bộ! Chi phí cuối: {current_cost}")
+                yield list(current_state), f"Bị kẹt ở đỉnh cục bộ! Chi phí cuối: {current_cost}"
                 return
             
-            current_state = best_neighbor
+            i, new_pos = best_move
+            counter.move(current_state[i], new_pos)
+            occupied.discard(current_state[i])
+            occupied.add(new_pos)
+            current_state[i] = new_pos
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = HillClimbingUI(root)
+    app = HillClimbingUI(root, read_board_size(max_n=None))
     root.mainloop()
\ No newline at end of file
@@ -1,12 +1,19 @@
 import tkinter as tk
 
+from QueensCore import EMPTY_MASKS, iter_columns, free_mask, place, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
+
 N = 8
 CELL_SIZE = 60
+IDS_FRONTIER_BUDGET = 200_000  # số nút tối đa giữ lại giữa hai lần lặp (0: luôn duyệt lại từ gốc)
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -23,40 +30,31 @@ class EightQueensUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -64,83 +62,105 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
 
     # --- Giải thuật IDS ---
 
-    def is_safe(self, state, row, col):
-        """Hàm is_safe giữ nguyên như các phiên bản trước."""
-        for r, c in enumerate(state):
-            if c == col or abs(r - row) == abs(c - col):
-                return False
-        return True
-    
-    def dls_solver(self, current_solution, depth, limit, solutions_list):
-        """Hàm DLS phụ trợ được gọi bởi IDS."""
-        if depth == N:
-            solutions_list.append(list(current_solution))
+    def dls_solver(self, current_solution, depth, limit, masks=EMPTY_MASKS, cutoff=None, cancel=None):
+        """Hàm DLS phụ trợ được gọi bởi IDS, sinh lần lượt từng nghiệm.
+
+        Nếu có list cutoff, các nút bị cắt ở độ sâu limit được ghi vào đó (theo thứ
+        tự duyệt) cho tới khi vượt IDS_FRONTIER_BUDGET.
+        """
+        check_cancelled(cancel)
+        if depth == self.n:
+            yield list(current_solution)
             return
         if depth >= limit:
+            if cutoff is not None and len(cutoff) <= IDS_FRONTIER_BUDGET:
+                cutoff.append((list(current_solution), masks))
             return
-        for col in range(N):
-            if self.is_safe(current_solution, depth, col):
-                current_solution.append(col)
-                self.dls_solver(current_solution, depth + 1, limit, solutions_list)
-                current_solution.pop() 
+        for col in iter_columns(free_mask(self.n, masks)):
+            current_solution.append(col)
+            yield from self.dls_solver(current_solution, depth + 1, limit, place(self.n, masks, col), cutoff, cancel)
+            current_solution.pop() 
 
     def ids_all_solutions(self):
         """Hàm tìm tất cả các nghiệm bằng thuật toán IDS."""
-        all_solutions = []
-        for limit in range(N + 1):
-            self.dls_solver([], 0, limit, all_solutions)
-            if all_solutions:
+        return list(self.iter_ids_solutions())
+
+    def iter_ids_solutions(self, cancel=None):
+        """Tăng dần giới hạn độ sâu, dừng ở giới hạn đầu tiên có nghiệm.
+
+        Mỗi lần lặp chạy tiếp từ biên (các nút bị cắt) của lần trước thay vì từ gốc,
+        nên các mức nông không bị sinh lại. Biên vượt IDS_FRONTIER_BUDGET thì bị bỏ
+        và lần sau chạy lại từ biên nông hơn cuối cùng còn giữ (ít nhất là từ gốc).
+        Các nút biên theo đúng thứ tự DFS nên nghiệm ra cùng thứ tự như duyệt từ gốc.
+        """
+        frontier = [([], EMPTY_MASKS)]
+        for limit in range(self.n + 1):
+            found = False
+            cutoff = []
+            for prefix, masks in frontier:
+                for solution in self.dls_solver(list(prefix), len(prefix), limit, masks, cutoff, cancel):
+                    found = True
+                    yield solution
+            if found:
                 break
-        return all_solutions
+            if len(cutoff) <= IDS_FRONTIER_BUDGET:
+                frontier = cutoff
 
     # --- Hiển thị nghiệm ---
 
     def prepare_solutions(self):
-        self.solutions = self.ids_all_solutions()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_ids_solutions)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol = self.solutions[idx]
-        self.queens = {(r, sol[r]) for r in range(N)}
+    def show_solution(self, sol):
+        self.queens = {(r, sol[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve IDS trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve IDS trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
@@ -3,6 +3,9 @@ import time
 import random
 import math
 
+from QueensCore import cell_size_for, read_board_size, ConflictCounter
+from QueensUI import BoardCanvas, StepSolverMixin
+
 N = 8
 CELL_SIZE = 60
 
@@ -10,10 +13,15 @@ INITIAL_TEMPERATURE = 50.0
 
 COOLING_RATE = 0.995
 
-class SimulatedAnnealingUI:
-    def __init__(self, root):
+UPDATE_INTERVAL = 0.05  # số giây tối thiểu giữa hai lần gửi trạng thái về giao diện
+
+class SimulatedAnnealingUI(StepSolverMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - Tuned Simulated Annealing")
+        self.n = n
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - Tuned Simulated Annealing")
 
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
@@ -23,41 +31,36 @@ class SimulatedAnnealingUI:
         
         btn_solve = tk.Button(frame_top, text="Solve Simulated Annealing", width=25, command=self.solve_simulated_annealing)
         btn_solve.pack(side=tk.LEFT, padx=5)
+
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
         
-        self.lbl_status = tk.Label(frame_top, text="Click để đặt tối đa 8 quân hậu", font=("Arial", 10, "bold"))
+        self.lbl_status = tk.Label(frame_top, text=f"Click để đặt tối đa {self.n} quân hậu", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.state = []
+        self.task = None
         self.canvas.bind("<Button-1>", self.on_click)
         self.draw_board()
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for r, c in self.state:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.state)
         self.root.update_idletasks()
         
     def on_click(self, event):
-        col = event.x // CELL_SIZE
-        row = event.y // CELL_SIZE
+        if self.is_solving():
+            self.root.bell()
+            return
+        col = event.x // self.cell_size
+        row = event.y // self.cell_size
         pos = (row, col)
 
         if pos in self.state:
             self.state.remove(pos)
-        elif len(self.state) < 8:
+        elif len(self.state) < self.n:
             self.state.append(pos)
         else:
             self.root.bell()
@@ -66,13 +69,14 @@ class SimulatedAnnealingUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.state = []
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         cost = self.calculate_cost(self.state)
-        self.lbl_status.config(text=f"Đã đặt: {len(self.state)}/8 quân hậu | Chi phí hiện tại: {cost}")
+        self.lbl_status.config(text=f"Đã đặt: {len(self.state)}/{self.n} quân hậu | Chi phí hiện tại: {cost}")
 
     
     def calculate_cost(self, state):
@@ -86,45 +90,66 @@ class SimulatedAnnealingUI:
         return cost
 
     def solve_simulated_annealing(self):
-        if len(self.state) != 8:
-            self.lbl_status.config(text="Lỗi: Vui lòng đặt đủ 8 quân hậu trước khi giải!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        if len(self.state) != self.n:
+            self.lbl_status.config(text=f"Lỗi: Vui lòng đặt đủ {self.n} quân hậu trước khi giải!")
             return
 
-        current_state = list(self.state)
+        start_state = list(self.state)
+        self.run_solver(lambda: self.simulated_annealing_steps(start_state))
+
+    def on_solver_step(self, step):
+        self.state, message = step
+        self.draw_board()
+        self.lbl_status.config(text=message)
+
+    def simulated_annealing_steps(self, current_state):
+        """Sinh (trạng thái, thông báo) sau mỗi bước; chạy trên luồng phụ nên không chạm vào Tk.
+
+        Nước đi được chấm bằng ConflictCounter.move_delta trong O(1) và chỉ áp dụng
+        tại chỗ khi được chấp nhận; thứ tự gọi random giữ nguyên như bản cũ. Trạng thái
+        chỉ được sao chép và gửi đi mỗi UPDATE_INTERVAL giây, không phải sau mỗi bước.
+        """
+        current_state = list(current_state)
+        counter = ConflictCounter(self.n, current_state)
+        occupied = set(current_state)
         temperature = INITIAL_TEMPERATURE
+        next_update = time.monotonic()
         
         while temperature > 0.1:
-            current_cost = self.calculate_cost(current_state)
-            self.state = current_state
-            self.draw_board()
-            self.lbl_status.config(text=f"Đang tìm... Chi phí: {current_cost} | Nhiệt độ: {temperature:.2f}")
-            time.sleep(0.01)
-
+            current_cost = counter.cost
             if current_cost == 0:
-                self.lbl_status.config(text=f"Đã tìm thấy lời giải! Chi phí: 0")
+                yield list(current_state), f"Đã tìm thấy lời giải! Chi phí: 0"
                 return
+            now = time.monotonic()
+            if now >= next_update:
+                next_update = now + UPDATE_INTERVAL
+                yield list(current_state), f"Đang tìm... Chi phí: {current_cost} | Nhiệt độ: {temperature:.2f}"
 
-            neighbor_state = list(current_state)
-            queen_to_move_idx = random.randint(0, len(neighbor_state) - 1)
+            queen_to_move_idx = random.randint(0, len(current_state) - 1)
             while True:
-                new_pos = (random.randint(0, N - 1), random.randint(0, N - 1))
-                if new_pos not in neighbor_state:
-                    neighbor_state[queen_to_move_idx] = new_pos
+                new_pos = (random.randint(0, self.n - 1), random.randint(0, self.n - 1))
+                if new_pos not in occupied:
                     break
             
-            neighbor_cost = self.calculate_cost(neighbor_state)
-            delta_cost = neighbor_cost - current_cost
+            old_pos = current_state[queen_to_move_idx]
+            delta_cost = counter.move_delta(old_pos, new_pos)
 
             if delta_cost < 0 or random.random() < math.exp(-delta_cost / temperature):
-                current_state = neighbor_state
+                counter.move(old_pos, new_pos)
+                occupied.discard(old_pos)
+                occupied.add(new_pos)
+                current_state[queen_to_move_idx] = new_pos
             
             temperature *= COOLING_RATE
             
-        final_cost = self.calculate_cost(current_state)
-        self.lbl_status.config(text=f"Quá trình kết thúc. Chi phí cuối: {final_cost}")
+        final_cost = counter.cost
+        yield list(current_state), f"Quá trình kết thúc. Chi phí cuối: {final_cost}"
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = SimulatedAnnealingUI(root)
+    app = SimulatedAnnealingUI(root, read_board_size(max_n=None))
     root.mainloop()
\ No newline at end of file
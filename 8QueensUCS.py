@@ -1,14 +1,21 @@
 import tkinter as tk
 import heapq
-import math
+
+from QueensCore import CompactNodes, StepCostModel, iter_columns, free_mask, place, cell_size_for, read_board_size, SolutionStream, check_cancelled
+from QueensUI import BoardCanvas, SolutionStreamMixin
 
 N = 8
 CELL_SIZE = 60
+COST_SCALE = None  # vd 10**6: cộng chi phí bằng số nguyên thay vì số thực
 
-class EightQueensUI:
-    def __init__(self, root):
+class EightQueensUI(SolutionStreamMixin):
+    def __init__(self, root, n=N):
         self.root = root
-        self.root.title("8 Queens Puzzle - UCS with Distance Cost")
+        self.n = n
+        self.cost_model = StepCostModel(n, scale=COST_SCALE)
+        self.cell_size = cell_size_for(n, CELL_SIZE)
+        self.queen_font = ("Segoe UI Symbol", self.cell_size * 32 // CELL_SIZE)
+        self.root.title(f"{self.n} Queens Puzzle - UCS with Distance Cost")
         frame_top = tk.Frame(root, pady=5)
         frame_top.pack()
 
@@ -24,40 +31,31 @@ class EightQueensUI:
         btn_next = tk.Button(frame_top, text="Next", width=10, command=self.next_solution)
         btn_next.pack(side=tk.LEFT, padx=5)
 
+        btn_cancel = tk.Button(frame_top, text="Cancel", width=10, command=self.cancel_solve)
+        btn_cancel.pack(side=tk.LEFT, padx=5)
+
         self.lbl_status = tk.Label(frame_top, text="Click để đặt/gỡ quân hậu ♛", font=("Arial", 10, "bold"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
 
-        self.canvas = tk.Canvas(root, width=N * CELL_SIZE, height=N * CELL_SIZE)
+        self.canvas = BoardCanvas(root, self.n, self.cell_size, self.queen_font)
         self.canvas.pack()
 
         self.queens = set()
-        self.solutions = [] 
-        self.current_index = -1
+        self.stream = None
+        self.task = None
 
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
     def draw_board(self):
-        self.canvas.delete("all")
-        for r in range(N):
-            for c in range(N):
-                x1, y1 = c * CELL_SIZE, r * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                color = "white" if (r + c) % 2 == 0 else "black"
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black")
-
-        for (r, c) in self.queens:
-            x = c * CELL_SIZE + CELL_SIZE // 2
-            y = r * CELL_SIZE + CELL_SIZE // 2
-            fill_color = "black" if (r + c) % 2 == 0 else "white"
-            self.canvas.create_text(x, y, text="♛", font=("Segoe UI Symbol", 32), fill=fill_color)
+        self.canvas.show_queens(self.queens)
 
     def on_click(self, event):
-        r, c = event.y // CELL_SIZE, event.x // CELL_SIZE
+        r, c = event.y // self.cell_size, event.x // self.cell_size
         if (r, c) in self.queens:
             self.queens.remove((r, c))
         else:
-            if len(self.queens) >= 8:
+            if len(self.queens) >= self.n:
                 self.root.bell()
                 return
             self.queens.add((r, c))
@@ -65,92 +63,94 @@ class EightQueensUI:
         self.update_status()
 
     def clear_board(self):
+        self.cancel_solve()
         self.queens.clear()
-        self.solutions = []
-        self.current_index = -1
+        self.stream = None
         self.draw_board()
         self.update_status()
 
     def update_status(self):
         q = len(self.queens)
-        if self.solutions:
-
-            self.lbl_status.config(text=f"Queens: {q}/8 | Solution {self.current_index + 1}/{len(self.solutions)}")
+        if self.stream is not None:
+            self.lbl_status.config(text=f"Queens: {q}/{self.n} | Solution {self.stream.progress()}")
         else:
-            self.lbl_status.config(text=f"Queens: {q}/8")
+            self.lbl_status.config(text=f"Queens: {q}/{self.n}")
             
     # --- Giải thuật UCS ---
-    
-    def an_toan(self, state, col, row):
-        for r, c in enumerate(state):
-            if c == col or abs(c - col) == abs(r - row):
-                return False
-        return True
-
-    def calculate_cost(self, current_cost, state, col, row):
-        if not state:
+
+    def calculate_cost(self, current_cost, last_c, col):
+        """Cộng chi phí bước từ quân hậu ở hàng trước (cột last_c, None nếu chưa có) tới cột col."""
+        if last_c is None:
             return current_cost
-        
-        last_r = len(state) - 1
-        last_c = state[-1]
-        
-        distance = math.sqrt((row - last_r)**2 + (col - last_c)**2)
-        
-        return current_cost + distance
+        return current_cost + self.cost_model.step(last_c, col)
 
     def ucs_with_distance_cost(self):
-        solutions = []
-        pq = [(0, [])]
+        solutions = list(self.iter_ucs_solutions())
+        solutions.sort(key=lambda x: x[0])
+        return solutions
 
-        while pq:
-            cost, state = heapq.heappop(pq)
-            row = len(state)
+    def iter_ucs_solutions(self, cancel=None):
+        """Sinh lần lượt (chi phí, nghiệm); chi phí các bước không âm nên nghiệm ra theo chi phí tăng dần."""
+        nodes = CompactNodes(self.n)
+        pq = [nodes.entry(CompactNodes.ROOT, 0)]  # mỗi mục gói (chi phí, nút) trong một số nguyên
 
-            if row == N:
-                solutions.append((round(cost, 2), state))
+        while pq:
+            check_cancelled(cancel)
+            entry = heapq.heappop(pq)
+            cost, = nodes.priorities(entry, 1)
+            node = nodes.node(entry)
+            row = nodes.row(node)
+
+            if row == self.n:
+                yield (self.cost_model.display(cost), nodes.path(node))
                 continue
 
-            for col in range(N):
-                if self.an_toan(state, col, row):
-                    new_state = state + [col]
-                    new_cost = self.calculate_cost(cost, state, col, row)
-                    heapq.heappush(pq, (new_cost, new_state))
-        
-        solutions.sort(key=lambda x: x[0])
-        return solutions
+            masks = nodes.masks(node)
+            last_c = nodes.last_col(node, row)
+            for col in iter_columns(free_mask(self.n, masks)):
+                new_cost = self.calculate_cost(cost, last_c, col)
+                heapq.heappush(pq, nodes.entry(nodes.child(node, row, col, place(self.n, masks, col)), new_cost))
 
     # --- Hiển thị nghiệm ---
     def prepare_solutions(self):
-        self.solutions = self.ucs_with_distance_cost()
-        self.current_index = 0 if self.solutions else -1
-        if self.solutions:
-            self.show_solution_at(self.current_index)
-        else:
-            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.stream = SolutionStream(self.iter_ucs_solutions)
+        self.lbl_status.config(text="Đang giải...")
+        self.fetch_solution(self.stream.next)
 
-    def show_solution_at(self, idx):
-        sol_state = self.solutions[idx][1]
-        self.queens = {(r, sol_state[r]) for r in range(N)}
+    def show_solution(self, sol):
+        sol_state = sol[1]
+        self.queens = {(r, sol_state[r]) for r in range(self.n)}
         self.draw_board()
         self.update_status()
 
     def next_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve UCS trước!")
             return
-        self.current_index = (self.current_index + 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        self.fetch_solution(self.stream.next)
 
     def prev_solution(self):
-        if not self.solutions:
+        if self.stream is None:
             self.lbl_status.config(text="Hãy nhấn Solve UCS trước!")
             return
-        self.current_index = (self.current_index - 1) % len(self.solutions)
-        self.show_solution_at(self.current_index)
+        if self.is_solving():
+            self.root.bell()
+            return
+        sol = self.stream.prev()
+        if sol is None:
+            self.lbl_status.config(text="Nghiệm trước đó không còn trong bộ đệm lịch sử!")
+            return
+        self.show_solution(sol)
 
 
 # --- Main ---
 if __name__ == "__main__":
     root = tk.Tk()
-    app = EightQueensUI(root)
+    app = EightQueensUI(root, read_board_size())
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,548 @@
+# --- Lõi bitmask dùng chung cho các thuật toán đặt hậu ---
+#
+# Trạng thái đặt hậu theo hàng được mô tả bằng bộ ba số nguyên (cols, ld, rd):
+#   cols: các cột đã có hậu
+#   ld:   các ô của hàng kế tiếp bị tấn công theo đường chéo đi xuống bên phải
+#   rd:   các ô của hàng kế tiếp bị tấn công theo đường chéo đi xuống bên trái
+# Bit thứ c ứng với cột c, nên kiểm tra an toàn và liệt kê cột trống đều là O(1).
+
+import math
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import partial
+from itertools import chain, islice
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tuỳ chọn: thiếu thì dùng bản thuần Python
+    np = None
+
+DEFAULT_N = 8
+MAX_N = 20          # giới hạn N cho các thuật toán liệt kê toàn bộ nghiệm
+BOARD_PIXELS = 640  # kích thước tối đa của bàn cờ trên màn hình
+MIN_CELL_SIZE = 16
+HISTORY_SIZE = 1000  # số nghiệm gần nhất giữ lại cho nút Previous
+CANCEL_POLL_SECONDS = 0.05  # chu kỳ kiểm tra yêu cầu huỷ khi chờ tiến trình con
+
+EMPTY_MASKS = (0, 0, 0)
+
+
+def read_board_size(default=DEFAULT_N, max_n=MAX_N):
+    """Đọc N từ tham số dòng lệnh, vd: python 8QueensDFS.py 12 (max_n=None: không giới hạn)."""
+    if len(sys.argv) < 2:
+        return default
+    try:
+        n = int(sys.argv[1])
+    except ValueError:
+        raise SystemExit(f"Kích thước bàn cờ không hợp lệ: {sys.argv[1]!r}")
+    if n < 1 or (max_n is not None and n > max_n):
+        raise SystemExit(f"N phải nằm trong khoảng 1..{max_n}" if max_n else "N phải lớn hơn 0")
+    return n
+
+
+class SearchCancelled(Exception):
+    """Generator của thuật toán dừng giữa chừng vì tác vụ giải đã bị huỷ."""
+
+
+def check_cancelled(cancel):
+    """Ném SearchCancelled nếu cancel (threading.Event, None nghĩa là không huỷ được) đã được đặt."""
+    if cancel is not None and cancel.is_set():
+        raise SearchCancelled
+
+
+def cell_size_for(n, cell_size):
+    """Thu nhỏ ô cờ khi N lớn để bàn cờ vẫn vừa màn hình."""
+    return max(MIN_CELL_SIZE, min(cell_size, BOARD_PIXELS // n))
+
+
+def full_mask(n):
+    return (1 << n) - 1
+
+
+def free_mask(n, masks):
+    """Bitmask các cột còn trống (an toàn) ở hàng kế tiếp."""
+    cols, ld, rd = masks
+    return full_mask(n) & ~(cols | ld | rd)
+
+
+def place(n, masks, col):
+    """Đặt hậu vào cột col của hàng kế tiếp, trả về bộ mask của hàng sau đó."""
+    cols, ld, rd = masks
+    bit = 1 << col
+    return (cols | bit, ((ld | bit) << 1) & full_mask(n), (rd | bit) >> 1)
+
+
+def iter_columns(mask):
+    """Duyệt các cột có bit bằng 1 theo thứ tự tăng dần."""
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+def open_columns(n, masks):
+    return list(iter_columns(free_mask(n, masks)))
+
+
+def remaining_attacks(n, masks):
+    """h(n) của các thuật toán có thông tin: số ô bị tấn công ở các hàng chưa đặt hậu.
+
+    Hàng thứ j tính từ hàng kế tiếp bị tấn công bởi cols | (ld << j) | (rd >> j),
+    nên h đọc thẳng từ bộ mask của nút (mỗi hàng một popcount), không cần dựng tập ô.
+    """
+    cols, ld, rd = masks
+    full = full_mask(n)
+    total = 0
+    for _ in range(n - cols.bit_count()):
+        total += (cols | ld | rd).bit_count()
+        ld = (ld << 1) & full
+        rd >>= 1
+    return total
+
+
+def masks_from_state(n, state):
+    """Dựng bộ mask từ danh sách cột đã đặt (dùng khi chỉ có state dạng list)."""
+    masks = EMPTY_MASKS
+    for col in state:
+        masks = place(n, masks, col)
+    return masks
+
+
+# --- Chi phí bước đi cho UCS / A* ---
+
+def distance_step_cost(last_col, col):
+    """Khoảng cách Euclid giữa hai quân hậu ở hai hàng liên tiếp."""
+    return math.sqrt(1 + (col - last_col) ** 2)
+
+
+class StepCostModel:
+    """Bảng chi phí tính sẵn cho mọi cặp (cột hàng trước, cột hàng sau) của bàn NxN.
+
+    Hai hàng liên tiếp luôn cách nhau 1 nên chi phí một bước chỉ phụ thuộc hai
+    cột; step_cost(last_col, col) bất kỳ đều được tính một lần vào bảng. Với
+    scale (vd 10**6) chi phí được làm tròn thành số nguyên đơn vị 1/scale để
+    heap so sánh số nguyên chính xác; display() đổi về đơn vị gốc để hiển thị.
+    """
+
+    def __init__(self, n, step_cost=distance_step_cost, scale=None):
+        self.n = n
+        self.scale = scale
+        self.unit = 1 if scale is None else scale  # 1 đơn vị chi phí gốc tính theo đơn vị của bảng
+        self.table = [self._convert(step_cost(last_col, col)) for last_col in range(n) for col in range(n)]
+        # Hai hậu hàng liên tiếp phải cách nhau ít nhất 2 cột: cận dưới cho chi phí mỗi bước còn lại
+        legal = [self.table[last_col * n + col] for last_col in range(n) for col in range(n) if abs(col - last_col) >= 2]
+        self.min_step = min(legal) if legal else 0
+
+    def _convert(self, cost):
+        return cost if self.scale is None else round(cost * self.scale)
+
+    def step(self, last_col, col):
+        return self.table[last_col * self.n + col]
+
+    def display(self, cost):
+        """Chi phí theo đơn vị gốc, làm tròn 2 chữ số như khi hiển thị."""
+        return round(cost if self.scale is None else cost / self.scale, 2)
+
+
+# --- Nút gọn cho các thuật toán dùng hàng đợi ưu tiên ---
+
+_DOUBLE = struct.Struct(">d")
+_DOUBLE_BITS = (1 << 64) - 1
+
+
+class CompactNodes:
+    """Mỗi nút của cây tìm kiếm, và cả mỗi mục của hàng đợi ưu tiên, là một số nguyên.
+
+    Các bit cao của nút là khoá đường đi: cột c ở hàng r là chữ số (c + 1) tại vị
+    trí r của số hệ cơ số N+1 có N chữ số (hàng chưa đặt là chữ số 0), nên so sánh
+    hai nút giống hệt so sánh hai list trạng thái theo thứ tự từ điển. 3N bit
+    thấp là bộ mask (cols, ld, rd) để mở rộng nút mà không phải dựng lại
+    đường đi; list trạng thái đầy đủ chỉ được giải mã cho nút đích.
+
+    entry() ghép các độ ưu tiên (số không âm, lưu bằng 64 bit của số thực nên thứ tự
+    được giữ nguyên) lên trên nút. Heap vì thế chỉ chứa số nguyên thay vì tuple, và
+    thứ tự lấy ra giống hệt heap của các tuple (ưu tiên 1, ưu tiên 2, ..., nút).
+    """
+
+    ROOT = 0
+
+    def __init__(self, n):
+        self.n = n
+        self.base = n + 1
+        self.weights = [self.base ** (n - 1 - row) for row in range(n)]
+        self.mask_bits = 3 * n
+        self.low = (1 << n) - 1
+        self.node_bits = (self.base ** n).bit_length() + self.mask_bits
+        self.node_mask = (1 << self.node_bits) - 1
+
+    def entry(self, node, *priorities):
+        value = 0
+        for priority in priorities:
+            value = (value << 64) | int.from_bytes(_DOUBLE.pack(priority), "big")
+        return (value << self.node_bits) | node
+
+    def node(self, entry):
+        return entry & self.node_mask
+
+    def priorities(self, entry, count):
+        """count độ ưu tiên đã ghép vào entry, theo đúng thứ tự truyền cho entry()."""
+        value = entry >> self.node_bits
+        return [_DOUBLE.unpack(((value >> 64 * k) & _DOUBLE_BITS).to_bytes(8, "big"))[0]
+                for k in reversed(range(count))]
+
+    def masks(self, node):
+        n, low = self.n, self.low
+        return (node >> 2 * n) & low, (node >> n) & low, node & low
+
+    def row(self, node):
+        """Số hậu đã đặt (cũng là hàng kế tiếp cần đặt)."""
+        return ((node >> 2 * self.n) & self.low).bit_count()
+
+    def last_col(self, node, row):
+        """Cột của hậu ở hàng row - 1, None nếu chưa đặt hậu nào."""
+        if row == 0:
+            return None
+        return (node >> self.mask_bits) // self.weights[row - 1] % self.base - 1
+
+    def child(self, node, row, col, child_masks):
+        cols, ld, rd = child_masks
+        key = (node >> self.mask_bits) + (col + 1) * self.weights[row]
+        return (key << self.mask_bits) | (cols << 2 * self.n) | (ld << self.n) | rd
+
+    def path(self, node):
+        key = node >> self.mask_bits
+        state = []
+        for weight in self.weights:
+            digit, key = divmod(key, weight)
+            if digit == 0:
+                break
+            state.append(digit - 1)
+        return state
+
+
+# --- Liệt kê song song theo tiền tố các hàng đầu ---
+
+def process_context():
+    """Ngữ cảnh multiprocessing cho các tiến trình con tạo từ luồng phụ của Tk.
+
+    fork cả một tiến trình nhiều luồng có thể treo (Python 3.12+ đã cảnh báo), nên
+    dùng forkserver khi hệ điều hành hỗ trợ, không thì spawn.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def safe_prefixes(n, rows, first_cols=None):
+    """Các tiền tố an toàn dài `rows` hàng theo thứ tự từ điển (hàng đầu giới hạn trong first_cols)."""
+    prefixes = [[col] for col in (range(n) if first_cols is None else first_cols)]
+    for _ in range(1, min(rows, n)):
+        prefixes = [prefix + [col]
+                    for prefix in prefixes
+                    for col in open_columns(n, masks_from_state(n, prefix))]
+    return prefixes
+
+
+def solutions_from_prefix(n, prefix, depth_limit=None):
+    """Mọi nghiệm bắt đầu bằng prefix theo thứ tự từ điển (hàm chạy trong tiến trình con)."""
+    limit = n if depth_limit is None else depth_limit
+    solutions = []
+    current = list(prefix)
+    if len(current) > limit:
+        return solutions
+
+    def _solve(row, masks):
+        if row == n:
+            solutions.append(list(current))
+            return
+        if row >= limit:
+            return
+        for col in iter_columns(free_mask(n, masks)):
+            current.append(col)
+            _solve(row + 1, place(n, masks, col))
+            current.pop()
+
+    _solve(len(current), masks_from_state(n, current))
+    return solutions
+
+
+def iter_pool_results(func, tasks, workers=None, cancel=None):
+    """Chạy func(task) trên ProcessPoolExecutor, sinh kết quả theo đúng thứ tự của tasks.
+
+    Chỉ khoảng hai tác vụ mỗi tiến trình được gửi trước, nên kết quả đầu tiên có ngay
+    và các kết quả chưa dùng tới không chiếm bộ nhớ. Kết quả được chờ từng quãng
+    CANCEL_POLL_SECONDS để dừng ngay khi cancel được đặt; dừng giữa chừng thì các tác
+    vụ chưa chạy bị huỷ.
+    """
+    tasks = iter(tasks)
+    window = 2 * (workers or os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+    try:
+        pending = deque(pool.submit(func, task) for task in islice(tasks, window))
+        while pending:
+            future = pending.popleft()
+            while not wait([future], timeout=CANCEL_POLL_SECONDS).done:
+                check_cancelled(cancel)
+            for task in islice(tasks, 1):
+                pending.append(pool.submit(func, task))
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_parallel_solutions(n, first_cols=None, prefix_rows=1, workers=None, depth_limit=None, cancel=None):
+    """Chia cây tìm kiếm theo tiền tố cho nhiều tiến trình, sinh nghiệm theo thứ tự từ điển."""
+    prefixes = safe_prefixes(n, prefix_rows, first_cols)
+    solve = partial(solutions_from_prefix, n, depth_limit=depth_limit)
+    for chunk in iter_pool_results(solve, prefixes, workers, cancel):
+        yield from chunk
+
+
+def parallel_solutions(n, first_cols=None, prefix_rows=1, workers=None, depth_limit=None):
+    """Như iter_parallel_solutions nhưng trả về cả danh sách."""
+    return list(iter_parallel_solutions(n, first_cols, prefix_rows, workers, depth_limit))
+
+
+# --- Đếm nghiệm mà không dựng bàn cờ nào ---
+
+def count_from_prefix(n, prefix, depth_limit=None):
+    """Số nghiệm bắt đầu bằng prefix; chỉ đệ quy trên bộ mask nên bộ nhớ gần như không đổi."""
+    limit = n if depth_limit is None else depth_limit
+    if limit < n or len(prefix) > n:
+        return 0  # DLS chỉ nhận nghiệm ở độ sâu N, giới hạn nhỏ hơn thì không có nghiệm nào
+    cols, ld, rd = masks_from_state(n, prefix)
+    if len(prefix) == n:
+        return 1
+    full = full_mask(n)
+    last = n - 1
+
+    def _count(cols, ld, rd, row):
+        avail = full & ~(cols | ld | rd)
+        if row == last:
+            return 1 if avail else 0  # hàng cuối chỉ còn đúng một cột chưa có hậu
+        total = 0
+        while avail:
+            bit = avail & -avail
+            avail ^= bit
+            total += _count(cols | bit, ((ld | bit) << 1) & full, (rd | bit) >> 1, row + 1)
+        return total
+
+    return _count(cols, ld, rd, len(prefix))
+
+
+def iter_solution_counts(n, depth_limit=None, prefix_rows=None, workers=None, cancel=None):
+    """Sinh tổng số nghiệm cộng dồn sau mỗi tiền tố được đếm xong.
+
+    Chỉ đếm các tiền tố có cột hàng đầu < N/2 (nhân đôi nhờ phép lật) và cột giữa khi
+    N lẻ. prefix_rows None: đếm tuần tự từng cột hàng đầu; khác None: mỗi tiền tố dài
+    prefix_rows hàng là một tác vụ của iter_pool_results.
+    """
+    half = n // 2
+    first_cols = range(n - half)
+    if prefix_rows is None:
+        prefixes = [[col] for col in first_cols]
+        counts = (count_from_prefix(n, prefix, depth_limit) for prefix in prefixes)
+    else:
+        prefixes = safe_prefixes(n, prefix_rows, first_cols)
+        counts = iter_pool_results(partial(count_from_prefix, n, depth_limit=depth_limit), prefixes, workers, cancel)
+    total = 0
+    for prefix, count in zip(prefixes, counts):
+        total += count * (2 if prefix[0] < half else 1)
+        yield total
+
+
+# --- Đối xứng của bàn cờ (4 phép xoay x 2 phép lật) ---
+
+def mirror(n, solution):
+    """Lật nghiệm theo trục dọc (cột c thành cột N-1-c)."""
+    return [n - 1 - c for c in solution]
+
+
+def rotate(n, solution):
+    """Xoay nghiệm 90 độ: ô (r, c) chuyển thành ô (c, N-1-r)."""
+    rotated = [0] * n
+    for r, c in enumerate(solution):
+        rotated[c] = n - 1 - r
+    return rotated
+
+
+def symmetries(n, solution):
+    """8 nghiệm đối xứng (có thể trùng nhau) sinh từ một nghiệm."""
+    result = []
+    current = list(solution)
+    for _ in range(4):
+        result.append(current)
+        result.append(mirror(n, current))
+        current = rotate(n, current)
+    return result
+
+
+def is_fundamental(n, solution):
+    """Nghiệm cơ bản = nghiệm nhỏ nhất (theo thứ tự từ điển) trong nhóm đối xứng của nó."""
+    return list(solution) == min(symmetries(n, solution))
+
+
+# --- Đếm xung đột cho bàn cờ đặt tự do (các thuật toán tìm kiếm cục bộ) ---
+
+class ConflictCounter:
+    """Số hậu trên từng hàng, cột và hai hướng đường chéo của bàn cờ đặt tự do.
+
+    Hai hậu khác ô chỉ có thể cùng nằm trên nhiều nhất một đường, nên chi phí
+    (số cặp tấn công nhau) bằng tổng C(k, 2) trên mọi đường và thay đổi của
+    một nước đi tính được trong O(1). Với with_table=True còn giữ thêm bảng
+    attacks của mọi ô, cập nhật O(N) sau mỗi nước đi được chấp nhận.
+    """
+
+    def __init__(self, n, queens, with_table=False):
+        self.n = n
+        self.rows = [0] * n
+        self.cols = [0] * n
+        self.diags = [0] * (2 * n - 1)   # theo r - c
+        self.antis = [0] * (2 * n - 1)   # theo r + c
+        self.table = [0] * (n * n) if with_table else None
+        self.cost = 0
+        for pos in queens:
+            self.add(pos)
+
+    def attacks(self, pos):
+        """Tổng số hậu trên 4 đường đi qua ô pos (hậu đứng tại pos được tính 4 lần)."""
+        r, c = pos
+        if self.table is not None:
+            return self.table[r * self.n + c]
+        return self.rows[r] + self.cols[c] + self.diags[r - c + self.n - 1] + self.antis[r + c]
+
+    def _shift(self, pos, step):
+        n = self.n
+        r, c = pos
+        self.rows[r] += step
+        self.cols[c] += step
+        self.diags[r - c + n - 1] += step
+        self.antis[r + c] += step
+        table = self.table
+        if table is None:
+            return
+        for k in range(n):
+            table[r * n + k] += step
+            table[k * n + c] += step
+        for k in range(max(0, r - c), min(n, n + r - c)):
+            table[k * n + k - r + c] += step
+        for k in range(max(0, r + c - n + 1), min(n, r + c + 1)):
+            table[k * n + r + c - k] += step
+
+    def add(self, pos):
+        self.cost += self.attacks(pos)
+        self._shift(pos, 1)
+
+    def remove(self, pos):
+        self._shift(pos, -1)
+        self.cost -= self.attacks(pos)
+
+    def move_delta(self, old, new):
+        """Chi phí thay đổi bao nhiêu nếu dời hậu từ old sang ô trống new."""
+        (r1, c1), (r2, c2) = old, new
+        shared = r1 == r2 or c1 == c2 or r1 - c1 == r2 - c2 or r1 + c1 == r2 + c2
+        return self.attacks(new) - shared - self.attacks(old) + 4
+
+    def move(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+
+def count_conflicts(n, boards):
+    """Số cặp hậu tấn công nhau của từng bàn cờ (danh sách ô (hàng, cột) khác nhau, cùng số hậu).
+
+    Có NumPy thì cả quần thể được đếm trong một lượt bincount trên 6N-2 đường
+    (hàng, cột, hai hướng chéo) của mọi bàn cờ; không có thì đếm từng bàn.
+    """
+    if not boards:
+        return []
+    if np is None:
+        return [ConflictCounter(n, board).cost for board in boards]
+    flat = chain.from_iterable(chain.from_iterable(boards))
+    cells = np.fromiter(flat, dtype=np.int64, count=2 * len(boards) * len(boards[0])).reshape(len(boards), -1, 2)
+    r, c = cells[..., 0], cells[..., 1]
+    lines = 6 * n - 2
+    # Đánh số đường: hàng [0, n), cột [n, 2n), chéo r-c [2n, 4n-1), chéo r+c [4n-1, 6n-2)
+    line_ids = np.concatenate((r, n + c, 3 * n - 1 + r - c, 4 * n - 1 + r + c), axis=1)
+    line_ids += lines * np.arange(len(boards))[:, None]
+    counts = np.bincount(line_ids.ravel(), minlength=len(boards) * lines).reshape(len(boards), lines)
+    return (counts * (counts - 1) // 2).sum(axis=1).tolist()
+
+
+# --- Lấy nghiệm theo yêu cầu cho các nút Next / Previous ---
+
+class SolutionStream:
+    """Lấy dần nghiệm từ generator; Previous chỉ quay lại được trong bộ đệm lịch sử có giới hạn.
+
+    factory(cancel) tạo generator mới và được gọi lại khi cần quay vòng từ đầu; generator
+    kiểm tra cancel (self.cancel_event) để dừng giữa chừng bằng SearchCancelled khi Event
+    được đặt, kể cả khi đang chạy trên luồng khác. Stream đã huỷ không dùng lại được.
+    """
+
+    def __init__(self, factory, history_size=HISTORY_SIZE):
+        self.factory = factory
+        self.cancel_event = threading.Event()
+        self.history = deque(maxlen=history_size)
+        self.index = -1  # chỉ số nghiệm đang hiển thị
+        self.total = None  # chỉ biết tổng số nghiệm khi generator đã cạn
+        self._generator = factory(self.cancel_event)
+        self._produced = 0
+        self._exhausted = False
+
+    def _cached(self, idx):
+        first = self._produced - len(self.history)
+        if first <= idx < self._produced:
+            return self.history[idx - first]
+        return None
+
+    def _pull(self):
+        solution = next(self._generator, None)
+        if solution is None:
+            self.total = self._produced
+            self._exhausted = True
+            return None
+        self.history.append(solution)
+        self._produced += 1
+        return solution
+
+    def next(self):
+        """Nghiệm kế tiếp (quay vòng về nghiệm đầu khi hết), None nếu không có nghiệm nào."""
+        solution = self._cached(self.index + 1)
+        if solution is None and not self._exhausted:
+            solution = self._pull()
+        if solution is not None:
+            self.index += 1
+            return solution
+        if not self.total:
+            return None
+        solution = self._cached(0)
+        if solution is None:
+            # Nghiệm đầu đã rơi khỏi bộ đệm: chạy lại generator từ đầu
+            self.history.clear()
+            self._generator = self.factory(self.cancel_event)
+            self._produced = 0
+            self._exhausted = False
+            solution = self._pull()
+        self.index = 0
+        return solution
+
+    def prev(self):
+        """Nghiệm trước đó, None nếu nó không còn trong bộ đệm lịch sử."""
+        idx = self.index - 1
+        if idx < 0:
+            if self.total is None:
+                return None
+            idx = self.total - 1
+        solution = self._cached(idx)
+        if solution is not None:
+            self.index = idx
+        return solution
+
+    def progress(self):
+        """Chuỗi dạng '3/92', hoặc '3/?' khi chưa biết tổng số nghiệm."""
+        total = "?" if self.total is None else self.total
+        return f"{self.index + 1}/{total}"
@@ -0,0 +1,187 @@
+# --- Thành phần giao diện Tk dùng chung cho các thuật toán đặt hậu ---
+
+import queue
+import threading
+import tkinter as tk
+
+POLL_INTERVAL_MS = 30
+
+
+class BackgroundTask:
+    """Chạy job trên luồng phụ để mainloop của Tk không bị chặn.
+
+    job là hàm (thường là generator) trả về các giá trị tiến trình. Luồng phụ
+    gửi chúng qua queue, còn luồng Tk đọc queue bằng root.after. Mỗi lần đọc
+    chỉ giá trị mới nhất được đưa tới on_progress. on_finish(cancelled) được
+    gọi một lần khi job kết thúc hoặc bị huỷ. Truyền cancel_event mà job cũng
+    kiểm tra thì job dừng được ngay giữa hai giá trị thay vì chạy nốt.
+    """
+
+    def __init__(self, root, job, on_progress, on_finish=None, cancel_event=None):
+        self.root = root
+        self.job = job
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event() if cancel_event is None else cancel_event
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        """Yêu cầu dừng; kết quả job gửi về sau đó bị bỏ qua."""
+        self.cancel_event.set()
+
+    def _run(self):
+        try:
+            items = self.job()
+            try:
+                for item in items:
+                    if self.cancel_event.is_set():
+                        break
+                    self.messages.put(("progress", item))
+            finally:
+                # Đóng generator ngay trên luồng này để các khối finally (dừng tiến trình con) chạy
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+        except Exception as exc:
+            self.messages.put(("error", exc))
+        self.messages.put(("done", None))
+
+    def _poll(self):
+        latest = None
+        has_progress = False
+        finished = False
+        error = None
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest, has_progress = payload, True
+            elif kind == "error":
+                error = payload
+            else:
+                finished = True
+
+        cancelled = self.cancel_event.is_set()
+        if has_progress and not cancelled:
+            self.on_progress(latest)
+        if cancelled and self.running:
+            # Không chờ luồng phụ: coi như đã xong để giao diện dùng tiếp được ngay
+            finished = True
+        if not finished:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+            return
+        self.running = False
+        if self.on_finish is not None:
+            self.on_finish(cancelled)
+        if error is not None and not cancelled:
+            raise error
+
+
+class BoardCanvas(tk.Canvas):
+    """Bàn cờ NxN: các ô vẽ một lần, quân hậu là các item gắn tag "queen".
+
+    show_queens chỉ so sánh với lần vẽ trước: hậu đã đổi chỗ thì được dời đi,
+    phần thừa bị xoá và phần thiếu được tạo thêm, các ô cờ không bị vẽ lại.
+    """
+
+    def __init__(self, master, n, cell_size, queen_font):
+        super().__init__(master, width=n * cell_size, height=n * cell_size)
+        self.n = n
+        self.cell_size = cell_size
+        self.queen_font = queen_font
+        self.queen_items = {}  # (hàng, cột) -> id của item quân hậu
+        for r in range(n):
+            for c in range(n):
+                x1, y1 = c * cell_size, r * cell_size
+                x2, y2 = x1 + cell_size, y1 + cell_size
+                color = "white" if (r + c) % 2 == 0 else "black"
+                self.create_rectangle(x1, y1, x2, y2, fill=color, outline="black", tags="square")
+
+    def _queen_style(self, r, c):
+        x = c * self.cell_size + self.cell_size // 2
+        y = r * self.cell_size + self.cell_size // 2
+        fill_color = "black" if (r + c) % 2 == 0 else "white"
+        return x, y, fill_color
+
+    def show_queens(self, queens):
+        """Đưa các quân hậu trên canvas về đúng danh sách ô queens."""
+        wanted = set(queens)
+        removed = [pos for pos in self.queen_items if pos not in wanted]
+        added = [pos for pos in queens if pos not in self.queen_items]
+
+        for old, new in zip(removed, added):
+            item = self.queen_items.pop(old)
+            x, y, fill_color = self._queen_style(*new)
+            self.coords(item, x, y)
+            self.itemconfig(item, fill=fill_color)
+            self.queen_items[new] = item
+        for old in removed[len(added):]:
+            self.delete(self.queen_items.pop(old))
+        for new in added[len(removed):]:
+            x, y, fill_color = self._queen_style(*new)
+            self.queen_items[new] = self.create_text(x, y, text="♛", font=self.queen_font, fill=fill_color, tags="queen")
+
+
+class SolverTaskMixin:
+    """Cửa sổ có một tác vụ giải chạy nền trong self.task (BackgroundTask hoặc None)."""
+
+    def start_task(self, job, on_progress, on_finish):
+        """Chạy job(cancel) trên luồng phụ; job kiểm tra Event cancel để dừng khi bấm Cancel."""
+        cancel = threading.Event()
+        self.task = BackgroundTask(self.root, lambda: job(cancel), on_progress, on_finish, cancel)
+
+    def is_solving(self):
+        return self.task is not None and self.task.running
+
+    def cancel_solve(self):
+        if self.is_solving():
+            self.task.cancel()
+
+
+class SolutionStreamMixin(SolverTaskMixin):
+    """Nút Next của các thuật toán liệt kê nghiệm: lấy từng nghiệm của self.stream trên luồng phụ.
+
+    Lớp dùng cần có root, lbl_status, stream (SolutionStream) và show_solution(sol).
+    """
+
+    def fetch_solution(self, pull):
+        """Lấy nghiệm trên luồng phụ để cửa sổ vẫn phản hồi khi N lớn.
+
+        Task dùng chung Event huỷ với self.stream, nên Cancel dừng luôn generator đang chạy.
+        """
+        self.task = BackgroundTask(self.root, lambda: [pull()], self.on_solution_fetched, self.on_solve_finished,
+                                   self.stream.cancel_event)
+
+    def on_solution_fetched(self, sol):
+        if sol is None:
+            self.stream = None
+            self.lbl_status.config(text="Không tìm được nghiệm nào!")
+        else:
+            self.show_solution(sol)
+
+    def on_solve_finished(self, cancelled):
+        if cancelled:
+            # Generator đã bị huỷ (hoặc đang dừng dở trên luồng cũ) nên không dùng lại được
+            self.stream = None
+            self.lbl_status.config(text="Đã huỷ!")
+
+
+class StepSolverMixin(SolverTaskMixin):
+    """Các thuật toán tìm kiếm cục bộ: vẽ lại bàn cờ theo từng bước generator gửi về.
+
+    Lớp dùng cần có root, lbl_status và on_solver_step(step).
+    """
+
+    def run_solver(self, steps):
+        """Chạy generator của thuật toán trên luồng phụ, vẽ lại bàn cờ theo từng bước nó gửi về."""
+        self.task = BackgroundTask(self.root, steps, self.on_solver_step, self.on_solver_finished)
+
+    def on_solver_finished(self, cancelled):
+        if cancelled:
+            self.lbl_status.config(text="Đã huỷ!")